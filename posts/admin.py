@@ -1,8 +1,13 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 from django.utils.safestring import mark_safe
 
+from posts import purge, search
 from posts.models import Post, Group, Comment, Profile
 
+User = get_user_model()
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -11,16 +16,53 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class PostAdmin(admin.ModelAdmin):
+class SearchIndexMixin:
+    """Поиск в админке через полнотекстовый индекс вместо LIKE по таблице."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        return search.filter_queryset(
+            queryset, search_term, self.search_kind), False
+
+
+class SoftDeleteMixin:
+    """
+    Удаление из админки только помечает объекты, строки удаляет
+    purge_deleted. Страница подтверждения не обходит связанные объекты:
+    на больших авторах этот обход сам по себе долгий.
+    """
+    soft_delete = None
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return ([str(obj) for obj in objs],
+                {self.opts.verbose_name_plural: len(objs)}, perms_needed, [])
+
+
+class PostAdmin(SoftDeleteMixin, SearchIndexMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
+    search_kind = search.POST
+    soft_delete = staticmethod(purge.delete_post)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(SoftDeleteMixin, SearchIndexMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'author', 'post', 'created')
     search_fields = ('text',)
+    search_kind = search.COMMENT
+    soft_delete = staticmethod(purge.delete_comment)
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
@@ -36,6 +78,15 @@ class ProfileAdmin(admin.ModelAdmin):
     get_image.short_description = 'Аватар'
 
 
+class SoftDeleteUserAdmin(SoftDeleteMixin, UserAdmin):
+    soft_delete = staticmethod(purge.delete_user)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).exclude(profile__is_deleted=True)
+
+
+admin.site.unregister(User)
+admin.site.register(User, SoftDeleteUserAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
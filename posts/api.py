@@ -0,0 +1,199 @@
+"""
+JSON-версии лент и страницы поста для мобильного клиента.
+
+Страница читается через .values() только с колонками, перечисленными в
+?fields=, без моделей и шаблонов, и листается теми же курсорами, что и
+HTML-ленты.
+"""
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .models import Comment, Group, Post, TimelineEntry
+from .paginator import CursorPaginator
+from .timeline import TimelinePaginator
+from yatube2.routers import replica_reads
+from yatube2.settings import POSTS_IN_PAGINATOR
+
+User = get_user_model()
+
+# Поле ответа -> колонка относительно модели.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+COMMENT_ORDERING = ('created', 'id')
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False,
+                   separators=(',', ':')),
+        content_type='application/json', status=status)
+
+
+def api_view(view):
+    """
+    Только GET, чтение с реплик; view возвращает данные, ApiError
+    становится ответом с ошибкой.
+    """
+    @wraps(view)
+    @replica_reads
+    def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response(
+                {'detail': 'Метод не поддерживается'}, status=405)
+        try:
+            return json_response(view(request, *args, **kwargs))
+        except ApiError as error:
+            return json_response({'detail': error.detail},
+                                 status=error.status)
+    return inner
+
+
+def select_fields(request, available=POST_FIELDS):
+    """Поля из ?fields=a,b,c; без параметра - все."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return available
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}')
+    return {name: available[name] for name in names}
+
+
+class ValuesMixin:
+    """Строки страницы - словари из .values() только с нужными колонками."""
+
+    prefix = ''
+
+    def select_values(self, queryset, output):
+        self.output = output
+        columns = {self.prefix + path for path in output.values()}
+        return queryset.values(*columns.union(self.fields))
+
+    def key(self, row):
+        return tuple(row[field] for field in self.fields)
+
+    def transform(self, row):
+        prefix = self.prefix
+        item = {name: row[prefix + path]
+                for name, path in self.output.items()}
+        if 'image' in item:
+            item['image'] = (default_storage.url(item['image'])
+                             if item['image'] else None)
+        return item
+
+
+class ValuesPaginator(ValuesMixin, CursorPaginator):
+    def __init__(self, queryset, per_page, output, **kwargs):
+        super().__init__(queryset, per_page, **kwargs)
+        self.object_list = self.select_values(queryset, output)
+
+
+class TimelineValuesPaginator(ValuesMixin, TimelinePaginator):
+    prefix = 'post__'
+
+    def __init__(self, user, per_page, output):
+        super().__init__(user, per_page)
+        self.object_list = self.select_values(
+            TimelineEntry.objects.filter(user=user, post__is_deleted=False),
+            output)
+
+    def fetch_heavy(self, authors, values, backward, limit):
+        paginator = ValuesPaginator(
+            Post.objects.filter(author_id__in=authors), limit, self.output)
+        return paginator.fetch(values, backward, limit)
+
+
+def page_data(page):
+    return {
+        'results': page.object_list,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def feed(request, queryset):
+    paginator = ValuesPaginator(
+        queryset, POSTS_IN_PAGINATOR, select_fields(request))
+    return page_data(paginator.get_page(request.GET.get('cursor')))
+
+
+@api_view
+def index(request):
+    return feed(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True).first()
+    if group_id is None:
+        raise ApiError(404, 'Группа не найдена')
+    return feed(request, Post.objects.filter(group_id=group_id))
+
+
+@api_view
+def profile(request, username):
+    # Без ORDER BY: строка одна, а сортировка с JOIN профиля - лишний шаг.
+    author_ids = list(User.objects.filter(username=username).exclude(
+        profile__is_deleted=True).values_list('id', flat=True).order_by()[:1])
+    if not author_ids:
+        raise ApiError(404, 'Пользователь не найден')
+    return feed(request, Post.objects.filter(author_id=author_ids[0]))
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+    paginator = TimelineValuesPaginator(
+        request.user, POSTS_IN_PAGINATOR, select_fields(request))
+    return page_data(paginator.get_page(request.GET.get('cursor')))
+
+
+@api_view
+def post_view(request, username, post_id):
+    """Пост и страница его комментариев; ?cursor= листает комментарии."""
+    output = select_fields(request)
+    paginator = ValuesPaginator(
+        Post.objects.filter(author__username=username, id=post_id), 1,
+        output)
+    # Без ORDER BY: строка одна, а сортировка мешает плану по ключу.
+    rows = list(paginator.object_list.order_by()[:1])
+    if not rows:
+        raise ApiError(404, 'Пост не найден')
+    comments = ValuesPaginator(
+        Comment.objects.filter(post_id=post_id), POSTS_IN_PAGINATOR,
+        COMMENT_FIELDS, ordering=COMMENT_ORDERING)
+    return {
+        'post': paginator.transform(rows[0]),
+        'comments': page_data(comments.get_page(request.GET.get('cursor'))),
+    }
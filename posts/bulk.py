@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from . import counters, groups, hot, search, timeline
+from .models import Post, Profile
+
+
+@contextmanager
+def keep_dates(*models):
+    """
+    Отключает auto_now_add, чтобы bulk_create сохранил переданные даты
+    (при импорте и генерации данных), и восстанавливает его на выходе.
+    """
+    fields = [field for model in models for field in model._meta.fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def rebuild_derived(chunk_size=1000, log=None):
+    """
+    Пересчитывает всё, что обычно поддерживают сигналы, после массовой
+    записи через bulk_create: счётчики, ленты подписок, поисковый индекс,
+    рейтинги популярного и сводки групп.
+    """
+    log = log or (lambda message: None)
+    counters.create_missing_profiles()
+    for queryset, recount in ((Profile.objects.all(),
+                               counters.recount_profiles),
+                              (Post.objects.all(), counters.recount_posts)):
+        for chunk in counters.chunked(queryset, chunk_size):
+            with transaction.atomic():
+                recount(chunk)
+    log('Счётчики пересчитаны')
+    with transaction.atomic():
+        timeline.rebuild_all()
+    log('Ленты подписок собраны')
+    with transaction.atomic():
+        search.rebuild()
+    log('Поисковый индекс перестроен')
+    hot.recompute(chunk_size)
+    log('Рейтинги популярного пересчитаны')
+    groups.rebuild_all()
+    log('Сводки групп пересчитаны')
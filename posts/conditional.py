@@ -0,0 +1,90 @@
+"""
+Условные GET-запросы для страниц поста, профиля и группы.
+
+Валидатор считается одним небольшим запросом по индексам до основной
+выборки, и если у клиента та же версия страницы, он получает 304 без
+отрисовки шаблона. Только для анонимов: у вошедших на странице есть
+CSRF-токен и личные данные.
+
+Last-Modified не отдаётся: версия зависит и от счётчиков, и от
+удалений, которые не двигают ни одну дату, и клиент с одним
+If-Modified-Since получал бы устаревшую страницу.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from .models import Group, Post, Profile
+
+
+def post_version(username, post_id):
+    row = Post.objects.filter(
+        author__username=username, id=post_id).values_list(
+        'updated', 'author__profile__posts_count').first()
+    if row is None:
+        return None
+    updated, posts_count = row
+    return f'post-{post_id}-{updated.timestamp()}-{posts_count}'
+
+
+def _last_updated(posts):
+    """
+    Дата последней правки видимого поста: один шаг по индексу
+    (автор или группа, is_deleted, updated) с конца.
+    """
+    return posts.order_by('-updated').values('updated')[:1]
+
+
+def profile_version(username):
+    # get() вместо first(): профиль у имени один, а ORDER BY id по
+    # соединению с пользователем SQLite сортировал бы в памяти.
+    try:
+        user_id, *counts = Profile.objects.values_list(
+            'user_id', 'posts_count', 'followers_count',
+            'following_count').get(
+            user__username=username, is_deleted=False)
+    except Profile.DoesNotExist:
+        return None
+    updated = _last_updated(Post.objects.filter(author_id=user_id)).first()
+    stamp = updated['updated'].timestamp() if updated else 0
+    counts = '-'.join(map(str, counts))
+    return f'profile-{user_id}-{stamp}-{counts}'
+
+
+def group_version(slug):
+    # Число постов - из сводки GroupStats, дата правки - по индексу:
+    # стоимость не зависит от размера группы.
+    row = Group.objects.filter(slug=slug).values_list(
+        'title', 'description', 'stats__posts_count').annotate(
+        last=Subquery(_last_updated(
+            Post.objects.filter(group=OuterRef('pk'))))).first()
+    if row is None:
+        return None
+    title, description, count, updated = row
+    # Правка названия или описания в админке тоже меняет страницу.
+    digest = hashlib.sha1(
+        f'{title}\n{description or ""}'.encode()).hexdigest()[:12]
+    stamp = updated.timestamp() if updated else 0
+    return f'group-{slug}-{digest}-{stamp}-{count or 0}'
+
+
+def anonymous_condition(version_func):
+    """
+    Отвечает анонимам 304 по ETag из version_func, который получает
+    аргументы view и возвращает etag или None.
+    """
+    def decorator(view):
+        def etag(request, *args, **kwargs):
+            return version_func(*args, **kwargs)
+
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            return conditional_view(request, *args, **kwargs)
+        return inner
+    return decorator
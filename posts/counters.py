@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, Profile
+
+User = get_user_model()
+
+
+def get_profile(user):
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        # Страницы читают с реплик, но созданного профиля там ещё нет:
+        # и создаём, и перечитываем его в основной базе.
+        profiles = Profile.objects.using(DEFAULT_DB_ALIAS)
+        profile, _ = profiles.get_or_create(user_id=user.pk)
+        recount_profiles(profiles.filter(pk=profile.pk))
+        return profiles.get(pk=profile.pk)
+
+
+def _bump(queryset, deltas, **values):
+    """Атомарно сдвигает счётчики через F(), не уводя их ниже нуля."""
+    for field, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+    values.update(
+        {field: F(field) + delta for field, delta in deltas.items()})
+    return queryset.update(**values)
+
+
+def bump_profile(user_id, **deltas):
+    """Меняет счётчики профиля: bump_profile(1, posts_count=1)."""
+    updated = _bump(Profile.objects.filter(user_id=user_id), deltas)
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        # Профиля ещё нет - создаём и считаем счётчики с нуля.
+        profile, _ = Profile.objects.get_or_create(user_id=user_id)
+        recount_profiles(Profile.objects.filter(pk=profile.pk))
+
+
+def bump_comments(post_id, delta):
+    # Новая дата изменения сбрасывает закешированную карточку поста.
+    _bump(Post.objects.filter(pk=post_id), {'comments_count': delta},
+          updated=timezone.now())
+
+
+def _count(queryset, field):
+    counts = queryset.order_by().values(field).annotate(
+        total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount_profiles(queryset):
+    return queryset.update(
+        posts_count=_count(
+            Post.objects.filter(author=OuterRef('user_id')), 'author'),
+        followers_count=_count(
+            Follow.objects.filter(author=OuterRef('user_id')), 'author'),
+        following_count=_count(
+            Follow.objects.filter(user=OuterRef('user_id')), 'user'))
+
+
+def recount_posts(queryset, **values):
+    return queryset.update(comments_count=_count(
+        Comment.objects.filter(post=OuterRef('pk')), 'post'), **values)
+
+
+def create_missing_profiles():
+    users = User.objects.filter(profile__isnull=True).values_list(
+        'pk', flat=True)
+    return len(Profile.objects.bulk_create(
+        [Profile(user_id=user_id) for user_id in users.iterator()],
+        batch_size=500, ignore_conflicts=True))
+
+
+def chunked(queryset, chunk_size):
+    """Делит queryset на диапазоны первичного ключа по chunk_size строк."""
+    queryset = queryset.order_by('pk')
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        last_pk = pks[-1]
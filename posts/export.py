@@ -0,0 +1,65 @@
+"""
+Выгрузка постов автора или группы в NDJSON: одна строка - один пост.
+
+Посты и их комментарии читаются двумя курсорами базы пачками по
+chunk_size и сливаются по id поста, поэтому память не растёт с числом
+записей.
+"""
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .api import COMMENT_FIELDS, POST_FIELDS
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def posts_for(username=None, slug=None):
+    posts = Post.objects.all()
+    if username is not None:
+        posts = posts.filter(author__username=username)
+    if slug is not None:
+        posts = posts.filter(group__slug=slug)
+    return posts
+
+
+def _comments(posts, chunk_size):
+    """
+    Пары (post_id, комментарий) для всех постов выгрузки: один запрос,
+    строки читаются курсором пачками в порядке post_id.
+    """
+    names = list(COMMENT_FIELDS)
+    comments = Comment.objects.filter(
+        post__in=posts.values('id')
+    ).order_by('post_id', 'created', 'id').values_list(
+        'post_id', *COMMENT_FIELDS.values())
+    for post_id, *row in comments.iterator(chunk_size=chunk_size):
+        yield post_id, dict(zip(names, row))
+
+
+def export_lines(posts, comments=False, chunk_size=CHUNK_SIZE):
+    """
+    Строки NDJSON по постам queryset в порядке id. Комментарии
+    сливаются с потоком постов по post_id, в памяти - только комментарии
+    текущего поста.
+    """
+    names = list(POST_FIELDS)
+    rows = posts.order_by('id').values_list(
+        *POST_FIELDS.values()).iterator(chunk_size=chunk_size)
+    stream = _comments(posts, chunk_size) if comments else iter(())
+    pending = next(stream, None)
+    for row in rows:
+        item = dict(zip(names, row))
+        item['image'] = (default_storage.url(item['image'])
+                         if item['image'] else None)
+        if comments:
+            item['comments'] = []
+            # Комментарии постов, которых нет в потоке (созданы или
+            # удалены между запросами), пропускаем.
+            while pending is not None and pending[0] <= item['id']:
+                if pending[0] == item['id']:
+                    item['comments'].append(pending[1])
+                pending = next(stream, None)
+        yield _encoder.encode(item) + '\n'
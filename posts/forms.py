@@ -1,6 +1,8 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 from django.forms.widgets import Textarea
 
+from . import images
 from .models import Post, Comment
 
 
@@ -22,6 +24,13 @@ class PostForm(ModelForm):
             'image': ('Загрузите изображение для новой записи')
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Пересжимаем только новую загрузку, а не уже сохранённый файл.
+        if isinstance(image, UploadedFile):
+            return images.normalize(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,85 @@
+"""
+Каталог групп: сводка активности в GroupStats и кеш групп по slug.
+
+Сводка меняется сигналами при публикации, переносе и удалении постов,
+поэтому /groups/ читает готовые числа без GROUP BY.
+"""
+import json
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Group, GroupStats, Post
+
+RECENT_POSTERS = 5
+# Сколько последних постов смотреть, собирая разных авторов.
+RECENT_POSTS_SCAN = 50
+
+CACHE_TIMEOUT = 3600
+
+
+def _cache_key(slug):
+    return f'group:{slug}'
+
+
+def get_group(slug):
+    """
+    Группа по slug из кеша или None. Истёкшую запись перечитывает один
+    процесс, остальные тем временем отдают прежнюю.
+    """
+    return cache.get_or_set(
+        _cache_key(slug), lambda: Group.objects.filter(slug=slug).first(),
+        CACHE_TIMEOUT)
+
+
+def forget(slug):
+    cache.delete(_cache_key(slug))
+
+
+def _recent_posters(group_id):
+    names = []
+    authors = Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date', '-id').values_list('author__username', flat=True)
+    for name in authors[:RECENT_POSTS_SCAN]:
+        if name not in names:
+            names.append(name)
+            if len(names) == RECENT_POSTERS:
+                break
+    return names
+
+
+def refresh(group_id):
+    """Пересчитывает сводку одной группы по индексу (group, pub_date)."""
+    if group_id is None:
+        return
+    posts = Post.objects.filter(group_id=group_id)
+    last = posts.order_by('-pub_date').values_list(
+        'pub_date', flat=True).first()
+    GroupStats.objects.update_or_create(group_id=group_id, defaults={
+        'posts_count': posts.count(),
+        'last_post_at': last,
+        'recent_posters': json.dumps(
+            _recent_posters(group_id), ensure_ascii=False),
+    })
+
+
+def post_published(post):
+    """Новый пост: счётчик +1, дата и автор - в начало сводки."""
+    stats = GroupStats.objects.filter(group_id=post.group_id).first()
+    if stats is None:
+        refresh(post.group_id)
+        return
+    names = [post.author.username] + [
+        name for name in stats.recent_poster_names
+        if name != post.author.username]
+    GroupStats.objects.filter(pk=stats.pk).update(
+        posts_count=F('posts_count') + 1,
+        last_post_at=max(filter(None, (stats.last_post_at,
+                                       post.pub_date))),
+        recent_posters=json.dumps(names[:RECENT_POSTERS],
+                                  ensure_ascii=False))
+
+
+def rebuild_all():
+    for group_id in Group.objects.values_list('id', flat=True).iterator():
+        refresh(group_id)
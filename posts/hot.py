@@ -0,0 +1,87 @@
+"""
+Лента популярного: рейтинг поста затухает со временем, как на Hacker News.
+
+Рейтинги хранятся в PostScore и обновляются по одному посту при новом
+комментарии, а команда recompute_hot периодически пересчитывает
+затухание всех постов окна. Страница /hot/ читает готовые рейтинги по
+индексу, ничего не агрегируя.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Post, PostScore
+from .paginator import CursorPaginator
+
+# Вклад одного комментария и охвата автора (логарифм числа подписчиков).
+COMMENT_WEIGHT = 1.0
+REACH_WEIGHT = 0.5
+# Чем больше, тем быстрее старые посты уходят вниз.
+GRAVITY = 1.5
+# Посты старше окна в ленту не попадают и из таблицы удаляются.
+WINDOW = timedelta(days=7)
+
+# Порядок после id совпадает с аргументами score().
+SCORE_FIELDS = ('id', 'comments_count', 'author__profile__followers_count',
+                'pub_date')
+
+
+def score(comments, followers, pub_date, now):
+    age = max((now - pub_date).total_seconds() / 3600, 0)
+    activity = (1 + comments * COMMENT_WEIGHT
+                + math.log1p(followers or 0) * REACH_WEIGHT)
+    return activity / (age + 2) ** GRAVITY
+
+
+def update(post_id):
+    """Пересчитывает рейтинг одного поста, например после комментария."""
+    now = timezone.now()
+    row = Post.objects.filter(pk=post_id).values_list(*SCORE_FIELDS).first()
+    if row is None or row[3] < now - WINDOW:
+        PostScore.objects.filter(post_id=post_id).delete()
+        return
+    PostScore.objects.update_or_create(
+        post_id=post_id,
+        defaults={'score': score(*row[1:], now), 'computed': now})
+
+
+def recompute(batch_size=1000, log=None):
+    """Пересчитывает затухание всех постов окна пачками по id."""
+    log = log or (lambda message: None)
+    now = timezone.now()
+    cutoff = now - WINDOW
+    PostScore.objects.filter(post__pub_date__lt=cutoff).delete()
+    posts = Post.objects.filter(pub_date__gte=cutoff).order_by('id')
+    last_id, total = 0, 0
+    while True:
+        rows = list(posts.filter(id__gt=last_id).values_list(
+            *SCORE_FIELDS)[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        scores = [PostScore(post_id=row[0], score=score(*row[1:], now),
+                            computed=now) for row in rows]
+        with transaction.atomic():
+            PostScore.objects.filter(
+                post_id__in=[row[0] for row in rows]).delete()
+            PostScore.objects.bulk_create(scores)
+        total += len(rows)
+        log(f'Рейтинги пересчитаны: {total}')
+    return total
+
+
+class HotPaginator(CursorPaginator):
+    def __init__(self, per_page):
+        super().__init__(
+            PostScore.objects.select_related(
+                'post__author', 'post__group'),
+            per_page, ordering=('-score', '-post_id'))
+
+    def transform(self, row):
+        return row.post
+
+
+def get_page(cursor, per_page):
+    return HotPaginator(per_page).get_page(cursor)
@@ -0,0 +1,88 @@
+"""
+Картинки постов: нормализация при загрузке и удаление по последней ссылке.
+
+Загруженный файл разворачивается по EXIF-ориентации, уменьшается до
+POST_IMAGE_MAX_SIZE и пересжимается без метаданных: JPEG для обычных
+картинок, PNG для картинок с прозрачностью. Анимированные GIF остаются
+как есть. Одинаковые файлы хранилище сводит в один (yatube2.storage),
+поэтому файл удаляется, только когда на него не ссылается ни один пост.
+Миниатюры картинки, оставшейся только у скрытых постов, удаляются сразу.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+
+def _has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info)
+
+
+def normalize(upload):
+    """Пересжатая копия загруженной картинки как ContentFile."""
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+    buffer = BytesIO()
+    if _has_alpha(image):
+        image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+        extension = '.png'
+    else:
+        image.convert('RGB').save(
+            buffer, 'JPEG', quality=settings.POST_IMAGE_QUALITY,
+            optimize=True, progressive=True)
+        extension = '.jpg'
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(buffer.getvalue(), name=stem + extension)
+
+
+def in_use(name):
+    return Post.objects.filter(image=name).exists()
+
+
+def _release(name):
+    # BEGIN IMMEDIATE: пока идёт проверка и удаление, пост с той же
+    # картинкой не сохранится (Post.save), а сохраняемый дождётся и
+    # запишет файл заново.
+    with transaction.atomic():
+        if in_use(name):
+            return
+        storage = Post._meta.get_field('image').storage
+        # Вместе с файлом уходят его миниатюры и записи о них в sorl.
+        delete(ImageFile(name, storage))
+
+
+def release(name):
+    """Удаляет файл после коммита, если на него больше никто не ссылается."""
+    if name:
+        transaction.on_commit(lambda: _release(name))
+
+
+def _hide(name):
+    with transaction.atomic():
+        if in_use(name):
+            return
+        storage = Post._meta.get_field('image').storage
+        # Оригинал остаётся до purge, но yatube2.media его не отдаёт.
+        delete(ImageFile(name, storage), delete_file=False)
+
+
+def hide(name):
+    """
+    Удаляет миниатюры картинки после коммита, если её не показывает
+    ни один видимый пост.
+    """
+    if name:
+        transaction.on_commit(lambda: _hide(name))
@@ -0,0 +1,182 @@
+import json
+import platform
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Маршруты, которые меняют данные: их замеряем внутри транзакции,
+# которая затем откатывается.
+WRITE_ROUTES = {'new_post', 'post_edit', 'post_delete', 'add_comment',
+                'profile_follow', 'profile_unfollow'}
+
+POST_DATA = {
+    'new_post': {'text': 'Пост из бенчмарка'},
+    'post_edit': {'text': 'Правка из бенчмарка'},
+    'add_comment': {'text': 'Комментарий из бенчмарка'},
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все маршруты posts/urls.py через тестовый клиент и '
+            'сохраняет p50/p95/p99 задержки, число SQL-запросов и размер '
+            'ответа по каждому маршруту в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на маршрут')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--user', help='Пользователь, от имени которого '
+                                           'идут запросы')
+        parser.add_argument('--output', default='bench_output.json')
+        parser.add_argument('--compare', help='JSON прошлого прогона для '
+                                              'сравнения')
+        parser.add_argument('--routes', nargs='*',
+                            help='Замерить только эти маршруты')
+
+    def handle(self, *args, **options):
+        self.sample = self.pick_sample(options['user'])
+        # Хост из ALLOWED_HOSTS и адрес вне INTERNAL_IPS, чтобы
+        # debug_toolbar не встраивался в ответы.
+        self.client = Client(
+            HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0],
+            REMOTE_ADDR='192.0.2.1')
+        self.client.force_login(self.sample['user'])
+
+        results = {}
+        for name, url in self.routes(options['routes']):
+            results[name] = self.measure(
+                name, url, options['requests'], options['warmup'])
+            self.report(name, results[name])
+
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'requests': options['requests'],
+            'routes': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты сохранены в {options["output"]}')
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def pick_sample(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(
+                follower__isnull=False).order_by('pk').first()
+        post = Post.objects.filter(author=user).order_by('-pub_date').first()
+        author = Follow.objects.filter(user=user).order_by('pk').first()
+        group = Group.objects.filter(posts__isnull=False).first()
+        if user is None or post is None or group is None:
+            raise CommandError('Нужны данные: выполните manage.py seed')
+        return {
+            'user': user,
+            'post': post,
+            'group': group,
+            'author': author.author if author else post.author,
+            'comment_post': Comment.objects.order_by('-pk').values_list(
+                'post_id', flat=True).first() or post.pk,
+        }
+
+    def routes(self, only):
+        sample = self.sample
+        kwargs = {
+            'slug': sample['group'].slug,
+            'username': sample['post'].author.username,
+            'post_id': sample['post'].pk,
+        }
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if only and name not in only:
+                continue
+            params = {key: kwargs[key]
+                      for key in pattern.pattern.converters}
+            if name in ('profile_follow', 'profile_unfollow'):
+                params['username'] = sample['author'].username
+            yield name, reverse(name, kwargs=params)
+
+    def request(self, name, url):
+        if name in POST_DATA:
+            return self.client.post(url, POST_DATA[name])
+        if name == 'search':
+            return self.client.get(url, {'q': 'кот'})
+        return self.client.get(url)
+
+    def measure(self, name, url, count, warmup):
+        timings, queries, sizes, statuses = [], [], [], set()
+        for number in range(warmup + count):
+            try:
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        response = self.request(name, url)
+                        if response.streaming:
+                            size = sum(len(chunk)
+                                       for chunk in response.streaming_content)
+                        else:
+                            size = len(response.content)
+                        elapsed = time.perf_counter() - started
+                    if name in WRITE_ROUTES:
+                        raise Rollback
+            except Rollback:
+                pass
+            if number < warmup:
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+            sizes.append(size)
+            statuses.add(response.status_code)
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:18} p50 {result["p50_ms"]:8.2f} мс  '
+            f'p95 {result["p95_ms"]:8.2f} мс  p99 {result["p99_ms"]:8.2f} мс  '
+            f'запросов {result["queries"]:3}  байт {result["bytes"]}')
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as previous_file:
+            previous = json.load(previous_file)['routes']
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = ((result['p50_ms'] - before['p50_ms'])
+                      / before['p50_ms'] * 100 if before['p50_ms'] else 0)
+            self.stdout.write(
+                f'{name:18} p50 {change:+7.1f}%  запросов '
+                f'{before["queries"]} -> {result["queries"]}  байт '
+                f'{before["bytes"]} -> {result["bytes"]}')
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from .bench import percentile
+
+User = get_user_model()
+
+BENCH_TEXT = 'Запись из конкурентного бенчмарка'
+
+
+class Command(BaseCommand):
+    help = ('Параллельно читает ленту и страницу поста и пишет '
+            'комментарии и посты, показывая, что чтения не ждут записи. '
+            'Созданные записи удаляются в конце.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Длительность в секундах')
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author').order_by(
+            '-pub_date').first()
+        user = User.objects.order_by('pk').first()
+        if post is None or user is None:
+            raise CommandError('Нужны данные: выполните manage.py seed')
+        self.read_urls = [
+            reverse('index'),
+            reverse('post', kwargs={'username': post.author.username,
+                                    'post_id': post.id}),
+        ]
+        self.comment_url = reverse('add_comment', kwargs={
+            'username': post.author.username, 'post_id': post.id})
+        self.user = user
+        self.lock = threading.Lock()
+        self.writing = 0
+        self.stats = {'read': [], 'write': [], 'overlapped': 0, 'errors': 0}
+        self.deadline = time.perf_counter() + options['duration']
+
+        threads = (
+            [threading.Thread(target=self.run, args=(self.read, number))
+             for number in range(options['readers'])]
+            + [threading.Thread(target=self.run, args=(self.write, number))
+               for number in range(options['writers'])])
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        try:
+            self.report(options['duration'])
+        finally:
+            Comment.objects.filter(text=BENCH_TEXT).delete()
+            Post.objects.filter(text=BENCH_TEXT).delete()
+
+    def client(self):
+        client = Client(
+            HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0],
+            REMOTE_ADDR='192.0.2.1')
+        client.force_login(self.user)
+        return client
+
+    def run(self, action, number):
+        # Ошибка вне timed(), например при входе, иначе молча завершила
+        # бы поток и не попала в отчёт.
+        try:
+            client = self.client()
+            while time.perf_counter() < self.deadline:
+                action(client, number)
+        except Exception:
+            with self.lock:
+                self.stats['errors'] += 1
+        finally:
+            connections.close_all()
+
+    def timed(self, kind, request):
+        started = time.perf_counter()
+        try:
+            response = request()
+            failed = response.status_code >= 500
+        except Exception:
+            failed = True
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            if failed:
+                self.stats['errors'] += 1
+            else:
+                self.stats[kind].append(elapsed)
+        return failed
+
+    def read(self, client, number):
+        url = self.read_urls[number % len(self.read_urls)]
+        self.timed('read', lambda: client.get(url))
+        with self.lock:
+            if self.writing:
+                self.stats['overlapped'] += 1
+
+    def write(self, client, number):
+        with self.lock:
+            self.writing += 1
+        try:
+            if number % 2:
+                self.timed('write', lambda: client.post(
+                    reverse('new_post'), {'text': BENCH_TEXT}))
+            else:
+                self.timed('write', lambda: client.post(
+                    self.comment_url, {'text': BENCH_TEXT}))
+        finally:
+            with self.lock:
+                self.writing -= 1
+
+    def report(self, duration):
+        for kind, title in (('read', 'Чтения'), ('write', 'Записи')):
+            timings = self.stats[kind]
+            if not timings:
+                self.stdout.write(f'{title}: нет успешных запросов')
+                continue
+            self.stdout.write(
+                f'{title}: {len(timings)} ({len(timings) / duration:.1f}/с), '
+                f'p50 {percentile(timings, 0.5):.2f} мс, '
+                f'p99 {percentile(timings, 0.99):.2f} мс')
+        self.stdout.write(
+            f'Чтений во время записи: {self.stats["overlapped"]}, '
+            f'ошибок: {self.stats["errors"]}')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты автора или группы в NDJSON, читая базу '
+            'пачками, так что память не зависит от числа постов.')
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='Имя пользователя')
+        source.add_argument('--group', help='Slug группы')
+        parser.add_argument('--comments', action='store_true',
+                            help='Добавить к постам комментарии')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int,
+                            default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not options['author'] and not options['group']:
+            raise CommandError('Укажите --author или --group')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        posts = export.posts_for(
+            username=options['author'], slug=options['group'])
+        lines = export.export_lines(
+            posts, comments=options['comments'],
+            chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                count = self.write(lines, output)
+            self.stderr.write(f'Выгружено постов: {count}')
+        else:
+            self.write(lines, self.stdout)
+
+    def write(self, lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для постов с картинками, у которых их нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать миниатюры всех постов')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(thumbnails='')
+        done = 0
+        for post in posts.iterator():
+            thumbnails.generate(post)
+            done += 1
+            if done % 100 == 0:
+                self.stdout.write(f'Обработано постов: {done}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, постов: {done}'))
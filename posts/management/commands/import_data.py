@@ -0,0 +1,203 @@
+import csv
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import keep_dates, rebuild_derived
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+KINDS = ('post', 'comment', 'follow')
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты, комментарии и подписки из NDJSON или CSV '
+            'пачками bulk_create с сохранением исходных дат, затем '
+            'одним проходом пересчитывает счётчики, ленты и поиск.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы .ndjson/.csv')
+        parser.add_argument('--kind', choices=KINDS,
+                            help='Тип строк CSV; в NDJSON он в поле type')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Строк в одной транзакции')
+        parser.add_argument('--create-users', action='store_true',
+                            help='Создавать неизвестных авторов')
+        parser.add_argument('--create-groups', action='store_true',
+                            help='Создавать неизвестные группы')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Не пересчитывать производные данные')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        self.options = options
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.batch = {kind: [] for kind in KINDS}
+        self.done = dict.fromkeys(KINDS, 0)
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+        with keep_dates(Post, Comment, Follow):
+            for path in options['paths']:
+                for location, kind, row in self.read(path):
+                    try:
+                        self.add(kind, row)
+                    except (TypeError, ValueError) as error:
+                        raise CommandError(f'{location}: {error}')
+                    if sum(map(len, self.batch.values())) >= (
+                            options['batch_size']):
+                        self.flush()
+            self.flush()
+
+        total = sum(self.done.values())
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано строк: {total} за {elapsed:.1f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с), '
+            f'пропущено: {self.skipped}'))
+        if not options['skip_rebuild']:
+            rebuild_derived(log=self.stdout.write)
+
+    def read(self, path):
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        with open(path, encoding='utf-8', newline='') as source:
+            if path.endswith('.csv'):
+                if not self.options['kind']:
+                    raise CommandError('Для CSV укажите --kind')
+                reader = csv.DictReader(source)
+                for row in reader:
+                    yield (f'{path}:{reader.line_num}',
+                           self.options['kind'], row)
+                return
+            for number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    raise CommandError(f'{path}:{number}: неверный JSON')
+                yield (f'{path}:{number}',
+                       row.get('type') or self.options['kind'], row)
+
+    def date(self, value):
+        if not value:
+            return timezone.now()
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f'неверная дата: {value!r}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    @staticmethod
+    def number(row, field):
+        value = row.get(field)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'неверное значение {field}: {value!r}')
+
+    def user_id(self, username):
+        if not username:
+            return None
+        if username not in self.users and self.options['create_users']:
+            user = User.objects.create(
+                username=username, password=make_password(None))
+            self.users[username] = user.id
+        return self.users.get(username)
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups and self.options['create_groups']:
+            group = Group.objects.create(title=slug, slug=slug)
+            self.groups[slug] = group.id
+        return self.groups.get(slug)
+
+    def add(self, kind, row):
+        if kind == 'post':
+            author_id = self.user_id(row.get('author'))
+            obj = author_id and Post(
+                id=self.number(row, 'id'), author_id=author_id,
+                group_id=self.group_id(row.get('group')),
+                text=row.get('text') or '', image=row.get('image') or None,
+                pub_date=self.date(row.get('pub_date')))
+        elif kind == 'comment':
+            author_id = self.user_id(row.get('author'))
+            post_id = self.number(row, 'post')
+            obj = author_id and post_id and Comment(
+                id=self.number(row, 'id'), post_id=post_id,
+                author_id=author_id, text=row.get('text') or '',
+                created=self.date(row.get('created')))
+        elif kind == 'follow':
+            user_id = self.user_id(row.get('user'))
+            author_id = self.user_id(row.get('author'))
+            obj = user_id and author_id and user_id != author_id and Follow(
+                user_id=user_id, author_id=author_id,
+                subscribe_date=self.date(row.get('subscribe_date')))
+        else:
+            raise ValueError(f'неизвестный тип строки: {kind!r}')
+        if obj:
+            self.batch[kind].append(obj)
+        else:
+            self.skipped += 1
+
+    def new_rows(self, kind, model):
+        """
+        Строки пачки без id или с id, которого ещё нет: повторный импорт
+        тех же файлов пропускает уже загруженное, а не падает.
+        """
+        rows = self.batch[kind]
+        ids = {obj.id for obj in rows if obj.id is not None}
+        seen = set(model._base_manager.filter(
+            id__in=ids).values_list('id', flat=True)) if ids else set()
+        new = []
+        for obj in rows:
+            if obj.id is not None:
+                if obj.id in seen:
+                    continue
+                seen.add(obj.id)
+            new.append(obj)
+        self.skipped += len(rows) - len(new)
+        self.batch[kind] = new
+        return new
+
+    def flush(self):
+        follows = self.batch['follow']
+        with transaction.atomic():
+            # Посты пишутся первыми: комментарии пачки могут ссылаться
+            # на них.
+            Post.objects.bulk_create(self.new_rows('post', Post))
+            comments = self.new_rows('comment', Comment)
+            if comments:
+                known = set(Post.objects.filter(
+                    id__in={comment.post_id for comment in comments}
+                ).values_list('id', flat=True))
+                valid = [comment for comment in comments
+                         if comment.post_id in known]
+                self.skipped += len(comments) - len(valid)
+                self.batch['comment'] = comments = valid
+                Comment.objects.bulk_create(comments)
+            Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        for kind in KINDS:
+            self.done[kind] += len(self.batch[kind])
+            self.batch[kind] = []
+        total = sum(self.done.values())
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f'Посты {self.done["post"]}, комментарии {self.done["comment"]}, '
+            f'подписки {self.done["follow"]}: '
+            f'{total / elapsed if elapsed else 0:.0f} строк/с')
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import purge
+
+
+class Command(BaseCommand):
+    help = ('Удаляет помеченные посты, комментарии и пользователей вместе '
+            'с зависимыми строками пачками в коротких транзакциях. '
+            'С --interval работает постоянно как фоновый процесс.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int,
+                            default=purge.CHUNK_SIZE,
+                            help='Строк в одной транзакции')
+        parser.add_argument('--interval', type=float,
+                            help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        while True:
+            result = purge.purge(options['chunk_size'],
+                                 log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено: комментариев {result["comments"]}, '
+                f'постов {result["posts"]}, '
+                f'пользователей {result["users"]}'))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import hot
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает затухание рейтингов популярного для постов '
+            'последней недели пачками и удаляет устаревшие. Запускается '
+            'периодически, например раз в 10 минут.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = hot.recompute(options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, рейтингов: {total}'))
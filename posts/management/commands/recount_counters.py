@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import (chunked, create_missing_profiles, recount_posts,
+                            recount_profiles)
+from posts.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики записей, подписчиков и комментариев '
+            'по частям, исправляя расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Сколько строк пересчитывать в одной '
+                                 'транзакции')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        created = create_missing_profiles()
+        self.stdout.write(f'Создано профилей: {created}')
+        for title, queryset, recount in (
+                ('Профили', Profile.objects.all(), recount_profiles),
+                ('Посты', Post.objects.all(), recount_posts)):
+            total = 0
+            for chunk in chunked(queryset, chunk_size):
+                with transaction.atomic():
+                    total += recount(chunk)
+                self.stdout.write(f'{title}: пересчитано {total}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
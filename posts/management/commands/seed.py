@@ -0,0 +1,183 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts.bulk import keep_dates, rebuild_derived
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+WORDS = (
+    'кот', 'собака', 'город', 'утро', 'дорога', 'книга', 'море', 'поезд',
+    'друг', 'музыка', 'осень', 'кофе', 'работа', 'дом', 'снег', 'фото',
+    'новости', 'лето', 'горы', 'река', 'вечер', 'проект', 'ужин', 'сад',
+)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями, подписками и картинками с '
+            'реалистичной неравномерностью активности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000,
+                            help='Подписки на обычных авторов')
+        parser.add_argument('--images', type=int, default=20,
+                            help='Сколько разных картинок раздать постам')
+        parser.add_argument('--image-share', type=float, default=0.2,
+                            help='Доля постов с картинкой')
+        parser.add_argument('--celebrities', type=int, default=3,
+                            help='Авторы, на которых подписаны почти все')
+        parser.add_argument('--celebrity-reach', type=float, default=0.9,
+                            help='Доля пользователей, подписанных на '
+                                 'каждую знаменитость')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить даты')
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс имён пользователей и групп')
+        parser.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['random_seed'])
+        self.now = timezone.now()
+        self.days = options['days']
+        prefix = options['prefix']
+
+        with transaction.atomic(), keep_dates(Post, Comment, Follow):
+            users = self.create_users(prefix, options['users'])
+            groups = self.create_groups(prefix, options['groups'])
+            images = self.create_images(prefix, options['images'])
+            # Активность авторов распределена по Парето: немногие пишут
+            # большую часть постов, остальные - редко.
+            weights = [self.random.paretovariate(1.2) for _ in users]
+            posts = self.create_posts(
+                users, weights, groups, images, options['posts'],
+                options['image_share'])
+            self.create_comments(users, posts, options['comments'])
+            self.create_follows(
+                users, weights, options['follows'], options['celebrities'],
+                options['celebrity_reach'])
+        rebuild_derived(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    def date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(self.days * 24 * 3600))
+
+    def bulk(self, model, objects):
+        created = []
+        for start in range(0, len(objects), BATCH_SIZE):
+            created += model.objects.bulk_create(
+                objects[start:start + BATCH_SIZE])
+        self.stdout.write(f'{model._meta.verbose_name_plural}: '
+                          f'{len(created)}')
+        return created
+
+    def create_users(self, prefix, count):
+        password = make_password(None)
+        self.bulk(User, [
+            User(username=f'{prefix}_user_{number}', password=password,
+                 first_name='Пользователь', last_name=str(number))
+            for number in range(count)])
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_user_').values_list(
+            'pk', flat=True))
+
+    def create_groups(self, prefix, count):
+        self.bulk(Group, [
+            Group(title=f'Сообщество {number}',
+                  slug=f'{prefix}-group-{number}',
+                  description=' '.join(self.random.choices(WORDS, k=8)))
+            for number in range(count)])
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-').values_list(
+            'pk', flat=True))
+
+    def create_images(self, prefix, count):
+        names = []
+        for number in range(count):
+            image = Image.new('RGB', (1600, 900), tuple(
+                self.random.randrange(256) for _ in range(3)))
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            names.append(default_storage.save(
+                f'posts/{prefix}_{number}.jpg',
+                ContentFile(buffer.getvalue())))
+        return names
+
+    def text(self, low, high):
+        return ' '.join(
+            self.random.choices(WORDS, k=self.random.randint(low, high)))
+
+    def create_posts(self, users, weights, groups, images, count,
+                     image_share):
+        authors = self.random.choices(users, weights=weights, k=count)
+        self.bulk(Post, [
+            Post(author_id=author_id,
+                 group_id=(self.random.choice(groups)
+                           if groups and self.random.random() < 0.5
+                           else None),
+                 text=self.text(5, 60),
+                 image=(self.random.choice(images)
+                        if images and self.random.random() < image_share
+                        else None),
+                 pub_date=self.date())
+            for author_id in authors])
+        return list(Post.objects.filter(author_id__in=users).values_list(
+            'pk', 'pub_date'))
+
+    def create_comments(self, users, posts, count):
+        if not posts:
+            return
+        # Обсуждения тоже неравномерны: часть постов собирает большинство
+        # комментариев.
+        weights = [self.random.paretovariate(1.5) for _ in posts]
+        targets = self.random.choices(posts, weights=weights, k=count)
+        self.bulk(Comment, [
+            Comment(post_id=post_id, author_id=self.random.choice(users),
+                    text=self.text(2, 20),
+                    created=pub_date + (self.now - pub_date) *
+                    self.random.random())
+            for post_id, pub_date in targets])
+
+    def create_follows(self, users, weights, count, celebrities, reach):
+        pairs = set()
+        ranked = sorted(zip(weights, users), reverse=True)
+        stars = [user_id for _, user_id in ranked[:celebrities]]
+        for star in stars:
+            for user_id in self.random.sample(users, int(len(users) * reach)):
+                if user_id != star:
+                    pairs.add((user_id, star))
+        # Обычные подписки тоже тянутся к активным авторам.
+        cum_weights = list(accumulate(weights))
+        target = len(pairs) + count
+        for _ in range(3):
+            missing = target - len(pairs)
+            if missing <= 0:
+                break
+            authors = self.random.choices(
+                users, cum_weights=cum_weights, k=missing)
+            for author_id in authors:
+                user_id = self.random.choice(users)
+                if user_id != author_id:
+                    pairs.add((user_id, author_id))
+        self.bulk(Follow, [
+            Follow(user_id=user_id, author_id=author_id,
+                   subscribe_date=self.date())
+            for user_id, author_id in pairs])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from yatube2.routers import sync_replicas
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS - заменитель репликации для локальной '
+            'проверки маршрутизатора.')
+
+    def handle(self, *args, **options):
+        aliases = sync_replicas()
+        if not aliases:
+            self.stdout.write('DATABASE_REPLICAS пуст, копировать некуда')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Реплики обновлены: {", ".join(aliases)}'))
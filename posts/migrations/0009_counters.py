@@ -0,0 +1,66 @@
+# Generated by Django 2.2.6 on 2026-10-18 11:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(queryset, field):
+    counts = queryset.order_by().values(field).annotate(
+        total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Profile = apps.get_model('posts', 'Profile')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    users = User.objects.filter(profile__isnull=True).values_list(
+        'pk', flat=True)
+    Profile.objects.bulk_create(
+        [Profile(user_id=user_id) for user_id in users.iterator()],
+        batch_size=500)
+    Profile.objects.update(
+        posts_count=count(
+            Post.objects.filter(author=OuterRef('user_id')), 'author'),
+        followers_count=count(
+            Follow.objects.filter(author=OuterRef('user_id')), 'author'),
+        following_count=count(
+            Follow.objects.filter(user=OuterRef('user_id')), 'user'))
+    Post.objects.update(comments_count=count(
+        Comment.objects.filter(post=OuterRef('pk')), 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписок'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Записей'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
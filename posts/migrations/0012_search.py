@@ -0,0 +1,71 @@
+import re
+
+from django.db import migrations
+
+# Копия posts.search.normalize на момент миграции: живой код может
+# измениться, а миграция должна заполнять индекс одинаково. Если
+# нормализация поменяется, индекс пересобирает rebuild_search_index.
+WORD_RE = re.compile(r'\w+')
+
+ENDINGS = sorted((
+    'ться', 'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ать', 'ять', 'ить',
+    'еть', 'тся', 'ешь', 'ете', 'ала', 'ила', 'ыла', 'ела', 'али', 'или',
+    'ыли', 'ели', 'ами', 'ями', 'ией', 'иям', 'иях', 'ием', 'ют', 'ут',
+    'ят', 'ат', 'ях', 'ах', 'ой', 'ей', 'ый', 'ий', 'ая', 'яя', 'ое', 'ее',
+    'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ов', 'ев', 'ия', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+MIN_STEM = 3
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize(text):
+    return ' '.join(stem(word) for word in WORD_RE.findall(text or ''))
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE posts_search USING fts5("
+            "body, kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, "
+            "tokenize='unicode61 remove_diacritics 2')")
+        for kind, rows in (
+                ('p', Post.objects.values_list('pk', 'pk', 'text')),
+                ('c', Comment.objects.values_list('pk', 'post_id', 'text'))):
+            cursor.executemany(
+                'INSERT INTO posts_search '
+                '(rowid, body, kind, object_id, post_id) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [(object_id * 2 + (kind == 'c'), normalize(text), kind,
+                  object_id, post_id)
+                 for object_id, post_id, text in rows.iterator()])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
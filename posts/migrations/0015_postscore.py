@@ -0,0 +1,46 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:08
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+from posts.hot import SCORE_FIELDS, WINDOW, score
+
+
+def fill_scores(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostScore = apps.get_model('posts', 'PostScore')
+    now = timezone.now()
+    rows = Post.objects.filter(
+        pub_date__gte=now - WINDOW).values_list(*SCORE_FIELDS)
+    PostScore.objects.bulk_create(
+        [PostScore(post_id=row[0], score=score(*row[1:], now),
+                   computed=now) for row in rows.iterator()],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hot_score', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('computed', models.DateTimeField(verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг поста',
+                'verbose_name_plural': 'Рейтинги постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postscore',
+            index=models.Index(fields=['-score', '-post'], name='postscore_score'),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:10
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    for group_id in Group.objects.values_list('id', flat=True):
+        posts = Post.objects.filter(group_id=group_id).order_by(
+            '-pub_date', '-id')
+        names = []
+        for name in posts.values_list('author__username', flat=True)[:50]:
+            if name not in names and len(names) < 5:
+                names.append(name)
+        GroupStats.objects.create(
+            group_id=group_id, posts_count=posts.count(),
+            last_post_at=posts.values_list('pub_date', flat=True).first(),
+            recent_posters=json.dumps(names, ensure_ascii=False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_postscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+                ('recent_posters', models.TextField(blank=True, default='', editable=False, verbose_name='Последние авторы')),
+            ],
+            options={
+                'verbose_name': 'Активность группы',
+                'verbose_name_plural': 'Активность групп',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['title'], name='group_title'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
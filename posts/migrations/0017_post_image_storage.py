@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:14
+
+from django.db import migrations, models
+import yatube2.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_groupstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Добавьте изображение к посту', null=True, storage=yatube2.storage.HashedStorage(), upload_to='posts/', verbose_name='Изображение'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['image'], name='post_image'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_feed_indexes_id'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_author_updated',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_group_updated',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'is_deleted', 'updated'], name='post_author_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'is_deleted', 'updated'], name='post_group_updated'),
+        ),
+    ]
@@ -1,6 +1,12 @@
-from django.db import models
+import json
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils.functional import cached_property
 from django.contrib.auth import get_user_model
 
+from yatube2.storage import HashedStorage
+
 User = get_user_model()
 
 
@@ -17,11 +23,28 @@ class Group(models.Model):
         ordering = ['title']
         verbose_name = 'Группу'
         verbose_name_plural = 'Группы'
+        indexes = [models.Index(fields=['title'], name='group_title')]
 
     def __str__(self):
         return self.title
 
 
+class SoftDeleteManager(models.Manager):
+    """
+    Менеджер по умолчанию: помеченные на удаление строки не видны ни
+    страницам, ни связанным менеджерам. Сами строки удаляет posts.purge.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что выводит карточка поста, без запросов на каждую строку."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     group = models.ForeignKey(Group, null=True, blank=True,
                               verbose_name='Сообщество',
@@ -33,20 +56,80 @@ class Post(models.Model):
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name='Дата публикации',
                                     db_index=True)
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name='Дата изменения')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts', verbose_name='Автор')
     image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              storage=HashedStorage(),
                               verbose_name='Изображение',
                               help_text='Добавьте изображение к посту')
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Комментариев')
+    thumbnails = models.TextField(
+        blank=True, default='', editable=False, verbose_name='Миниатюры',
+        help_text='JSON: ширина миниатюры -> URL')
+    is_deleted = models.BooleanField(
+        default=False, editable=False, verbose_name='Удалён')
+
+    objects = SoftDeleteManager.from_queryset(PostQuerySet)()
+    all_objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # Ленты группы и автора: поиск по ключу и сразу нужный порядок.
+            # id - второй ключ сортировки курсора: без него SQLite
+            # досортировывает совпавшие даты во временном B-дереве.
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date'),
+            # Последняя правка видимых постов в валидаторах условных GET:
+            # без is_deleted в ключе SQLite перебирал бы все посты.
+            models.Index(fields=['author', 'is_deleted', 'updated'],
+                         name='post_author_updated'),
+            models.Index(fields=['group', 'is_deleted', 'updated'],
+                         name='post_group_updated'),
+            # Сколько постов ссылается на файл картинки.
+            models.Index(fields=['image'], name='post_image'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            # HashedStorage может не писать файл, а вернуть имя уже
+            # лежащего: проверка и вставка поста идут под блокировкой
+            # записи, чтобы posts.images.release не удалил файл между ними.
+            with transaction.atomic():
+                return super().save(*args, **kwargs)
+        return super().save(*args, **kwargs)
+
+    @cached_property
+    def thumbnail_urls(self):
+        if not self.thumbnails:
+            return {}
+        return {int(width): url
+                for width, url in json.loads(self.thumbnails).items()}
+
+    @property
+    def thumbnail_url(self):
+        """Миниатюра основной ширины или оригинал, пока её нет."""
+        urls = self.thumbnail_urls
+        if urls:
+            return urls.get(settings.POST_THUMBNAIL_SIZE[0],
+                            urls[max(urls)])
+        return self.image.url if self.image else ''
+
+    @property
+    def thumbnail_srcset(self):
+        return ', '.join(f'{url} {width}w' for width, url
+                         in sorted(self.thumbnail_urls.items()))
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post,
@@ -62,11 +145,20 @@ class Comment(models.Model):
                                       'комментария')
     created = models.DateTimeField(auto_now_add=True,
                                    verbose_name='Дата комментария')
+    is_deleted = models.BooleanField(
+        default=False, editable=False, verbose_name='Удалён')
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_created'),
+        ]
 
     def __str__(self):
         return self.text
@@ -93,6 +185,11 @@ class Follow(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'], name='unique subscribers')]
+        # Подписчики автора: пересчёт счётчиков и рассылка по лентам.
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
@@ -105,6 +202,15 @@ class Profile(models.Model):
         default='users/avatar.png',
         verbose_name='Аватарка',
         help_text='Добавьте аватарку')
+    posts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Записей')
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Подписок')
+    # Пользователь удалён: вход закрыт, его данные удаляет posts.purge.
+    is_deleted = models.BooleanField(
+        default=False, editable=False, verbose_name='Удалён')
 
     class Meta:
         verbose_name_plural = 'Профили пользователей'
@@ -112,3 +218,118 @@ class Profile(models.Model):
 
     def __str__(self):
         return self.user.username
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок пользователя (fan-out on write)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique timeline entry')]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user_id}'
+
+
+class PostScore(models.Model):
+    """Рейтинг поста для ленты популярного, пересчитывается командой."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='hot_score',
+        verbose_name='Пост')
+    score = models.FloatField(verbose_name='Рейтинг')
+    computed = models.DateTimeField(verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+        indexes = [
+            models.Index(fields=['-score', '-post'], name='postscore_score'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.4f}'
+
+
+class GroupStats(models.Model):
+    """Сводка активности группы для каталога, обновляется сигналами."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа')
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Записей')
+    last_post_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Последняя запись')
+    # JSON-список имён последних авторов группы, свежие первыми.
+    recent_posters = models.TextField(
+        blank=True, default='', editable=False,
+        verbose_name='Последние авторы')
+
+    class Meta:
+        verbose_name = 'Активность группы'
+        verbose_name_plural = 'Активность групп'
+
+    def __str__(self):
+        return f'{self.group_id}: {self.posts_count}'
+
+    @cached_property
+    def recent_poster_names(self):
+        return json.loads(self.recent_posters) if self.recent_posters else []
+
+
+class PendingDeletion(models.Model):
+    """
+    Очередь очистки: помеченный объект, строки которого ещё не удалены.
+    Флаг is_deleted без индекса, поэтому очистка идёт по этой таблице.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    USER = 'user'
+    KINDS = ((POST, 'Пост'), (COMMENT, 'Комментарий'),
+             (USER, 'Пользователь'))
+
+    kind = models.CharField(max_length=10, choices=KINDS,
+                            verbose_name='Тип')
+    object_id = models.PositiveIntegerField(verbose_name='id объекта')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата пометки')
+
+    class Meta:
+        verbose_name = 'Объект на удаление'
+        verbose_name_plural = 'Очередь удаления'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'], name='unique pending deletion')]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
@@ -0,0 +1,169 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('-pub_date', '-id')
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class CursorPage:
+    """Страница ленты без общего числа записей и номеров страниц."""
+
+    def __init__(self, object_list, previous_cursor=None, next_cursor=None,
+                 cursor=None):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+        self.cursor = cursor or ''
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация: вместо LIMIT/OFFSET и COUNT(*) следующая страница
+    выбирается условием по ключу сортировки последней показанной записи,
+    поэтому стоимость любой страницы одинакова.
+
+    ordering - поля модели, по которым отсортирована лента; все в одном
+    направлении, последнее поле должно быть уникальным.
+    """
+
+    def __init__(self, object_list, per_page, ordering=DEFAULT_ORDERING):
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            raise ValueError('Все поля ordering должны иметь одно '
+                             'направление сортировки')
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = descending.pop()
+        self.fields = tuple(field.lstrip('-') for field in ordering)
+
+    def get_page(self, cursor=None):
+        direction, values = self.decode(cursor)
+        backward = direction == BACKWARD
+        rows = self.fetch(values, backward, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        if backward and not has_more:
+            # Дошли до начала ленты - показываем полную первую страницу.
+            return self.get_page()
+        rows = rows[:self.per_page]
+        if backward:
+            rows.reverse()
+        keys = [key for key, _ in rows]
+        objects = [obj for _, obj in rows]
+
+        previous_cursor = next_cursor = None
+        if keys:
+            if backward:
+                next_cursor = self.encode(FORWARD, keys[-1])
+                previous_cursor = self.encode(BACKWARD, keys[0])
+            else:
+                if has_more:
+                    next_cursor = self.encode(FORWARD, keys[-1])
+                if values is not None:
+                    previous_cursor = self.encode(BACKWARD, keys[0])
+        elif values is not None:
+            # За курсором пусто (например, записи удалили) - даём
+            # вернуться в начало ленты.
+            previous_cursor = ''
+        return CursorPage(objects, previous_cursor, next_cursor,
+                          cursor if values is not None else None)
+
+    def fetch(self, values, backward, limit):
+        """Возвращает до limit пар (ключ, объект) за курсором values."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(
+                self.seek(self.fields, values, backward))
+        rows = queryset.order_by(*self.order_by(backward))[:limit]
+        return [(self.key(row), self.transform(row)) for row in rows]
+
+    def order_by(self, backward, fields=None):
+        descending = self.descending != backward
+        return [('-' if descending else '') + field
+                for field in fields or self.fields]
+
+    def seek(self, fields, values, backward):
+        """Условие "строго после ключа values" в порядке обхода ленты."""
+        lookup = 'lt' if self.descending != backward else 'gt'
+        condition = Q()
+        for position, field in enumerate(fields):
+            exact = {name: value for name, value
+                     in zip(fields[:position], values[:position])}
+            exact[f'{field}__{lookup}'] = values[position]
+            condition |= Q(**exact)
+        return condition
+
+    def key(self, row):
+        return tuple(getattr(row, field) for field in self.fields)
+
+    def transform(self, row):
+        return row
+
+    def encode(self, direction, key):
+        payload = json.dumps(
+            [direction, [self.serialize(value) for value in key]],
+            separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode())
+        return token.decode().rstrip('=')
+
+    def decode(self, cursor):
+        if not cursor:
+            return FORWARD, None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (FORWARD, BACKWARD) or (
+                    len(raw) != len(self.fields)):
+                raise ValueError(cursor)
+            return direction, tuple(self.deserialize(field, value)
+                                    for field, value in zip(self.fields,
+                                                            raw))
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            # Испорченный курсор ведёт на первую страницу, как
+            # Paginator.get_page для неверного номера.
+            return FORWARD, None
+
+    def serialize(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def deserialize(self, field, value):
+        model_field = self.object_list.model._meta.get_field(field)
+        value = model_field.to_python(value)
+        if value is None:
+            raise ValueError(field)
+        return value
+
+
+def paginate(request, queryset, per_page, ordering=DEFAULT_ORDERING,
+             paginator_class=CursorPaginator):
+    paginator = paginator_class(queryset, per_page, ordering)
+    return paginator.get_page(request.GET.get('cursor'))
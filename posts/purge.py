@@ -0,0 +1,208 @@
+"""
+Мягкое удаление постов, комментариев и пользователей.
+
+delete_* только помечают строки и ставят их в очередь PendingDeletion:
+менеджеры по умолчанию помеченное не видят, и оно сразу пропадает со
+страниц. Сами строки вместе с зависимыми удаляет purge() пачками по
+CHUNK_SIZE, каждая в своей короткой транзакции, - запускается командой
+purge_deleted в отдельном процессе.
+После каждой пачки счётчики затронутых постов, профилей и групп
+пересчитываются заново, поэтому повторный или прерванный проход их не
+портит.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters, groups, hot, images, search
+from .models import (Comment, Follow, PendingDeletion, Post, PostScore,
+                     Profile, TimelineEntry)
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+
+
+def _enqueue(kind, object_id):
+    PendingDeletion.objects.get_or_create(kind=kind, object_id=object_id)
+
+
+def delete_post(post):
+    """Скрывает пост; счётчики автора и группы меняются сразу."""
+    with transaction.atomic():
+        if not Post.objects.filter(pk=post.pk).update(
+                is_deleted=True, updated=timezone.now()):
+            return
+        post.is_deleted = True
+        _enqueue(PendingDeletion.POST, post.pk)
+        search.unindex(search.POST, post.pk)
+        PostScore.objects.filter(post_id=post.pk).delete()
+        counters.bump_profile(post.author_id, posts_count=-1)
+        groups.refresh(post.group_id)
+        images.hide(post.image.name)
+
+
+def delete_comment(comment):
+    with transaction.atomic():
+        if not Comment.objects.filter(pk=comment.pk).update(
+                is_deleted=True):
+            return
+        comment.is_deleted = True
+        _enqueue(PendingDeletion.COMMENT, comment.pk)
+        search.unindex(search.COMMENT, comment.pk)
+        counters.bump_comments(comment.post_id, -1)
+    hot.update(comment.post_id)
+
+
+def delete_user(user):
+    """
+    Закрывает вход и скрывает посты и комментарии пользователя двумя
+    UPDATE по индексу автора. Сразу же посты уходят из поиска,
+    популярного и сводок групп, а у чужих постов с его комментариями
+    пересчитываются счётчики и сдвигается дата изменения - вместе с ней
+    меняются ETag страницы и ключ закешированной карточки.
+    """
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        Profile.objects.update_or_create(
+            user_id=user.pk, defaults={'is_deleted': True})
+        posts = Post.objects.filter(author_id=user.pk)
+        group_ids = set(posts.exclude(group=None).values_list(
+            'group_id', flat=True).distinct())
+        comments = Comment.objects.filter(author_id=user.pk)
+        commented = set(comments.values_list('post_id', flat=True).distinct())
+        pictures = set(posts.exclude(image='').exclude(image=None).values_list(
+            'image', flat=True))
+        search.unindex_author(user.pk)
+        now = timezone.now()
+        posts.update(is_deleted=True, updated=now)
+        comments.update(is_deleted=True)
+        counters.recount_posts(
+            Post.objects.filter(pk__in=commented), updated=now)
+        PostScore.objects.filter(post__author_id=user.pk).delete()
+        for group_id in group_ids:
+            groups.refresh(group_id)
+        for name in pictures:
+            images.hide(name)
+        _enqueue(PendingDeletion.USER, user.pk)
+    user.is_active = False
+    for post_id in commented:
+        hot.update(post_id)
+
+
+def _delete_chunks(queryset, chunk_size):
+    """Удаляет строки модели без сигналов пачками по pk."""
+    queryset = queryset.order_by('pk')
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                return
+            queryset.model._base_manager.filter(pk__in=ids).delete()
+
+
+def _purge_comments(queryset, chunk_size, log):
+    total = 0
+    queryset = queryset.order_by('pk')
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.values_list('pk', 'post_id')[:chunk_size])
+            if not rows:
+                return total
+            ids = [pk for pk, _ in rows]
+            post_ids = {post_id for _, post_id in rows}
+            # С флагом сигнал удаления не двигает счётчик поста: он
+            # пересчитывается ниже по оставшимся комментариям.
+            Comment.all_objects.filter(pk__in=ids).update(is_deleted=True)
+            Comment.all_objects.filter(pk__in=ids).delete()
+            counters.recount_posts(Post.objects.filter(pk__in=post_ids))
+        for post_id in post_ids:
+            hot.update(post_id)
+        total += len(ids)
+        log(f'Удалено комментариев: {total}')
+
+
+def _purge_posts(queryset, chunk_size, log):
+    total = 0
+    queryset = queryset.filter(is_deleted=True).order_by('pk')
+    while True:
+        rows = list(queryset.values_list(
+            'pk', 'author_id', 'group_id')[:chunk_size])
+        if not rows:
+            return total
+        ids = [pk for pk, _, _ in rows]
+        _purge_comments(Comment.all_objects.filter(post_id__in=ids),
+                        chunk_size, log)
+        # Записи лент - до поста, иначе каскад удалит их одним запросом.
+        _delete_chunks(TimelineEntry.objects.filter(post_id__in=ids),
+                       chunk_size)
+        with transaction.atomic():
+            Post.all_objects.filter(pk__in=ids).delete()
+            counters.recount_profiles(Profile.objects.filter(
+                user_id__in={author_id for _, author_id, _ in rows}))
+        for group_id in {group_id for _, _, group_id in rows}:
+            groups.refresh(group_id)
+        total += len(ids)
+        log(f'Удалено постов: {total}')
+
+
+def _purge_user(user_id, chunk_size, log):
+    """Строки пользователя пачками, затем он сам; False - не до конца."""
+    _purge_comments(Comment.all_objects.filter(
+        author_id=user_id, is_deleted=True), chunk_size, log)
+    _purge_posts(Post.all_objects.filter(author_id=user_id), chunk_size, log)
+    follows = Follow.objects.filter(Q(user_id=user_id) | Q(author_id=user_id))
+    total = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(follows.order_by('pk')[:chunk_size])
+            if not chunk:
+                break
+            # Через модели: сигналы поправят счётчики и ленты второй
+            # стороны подписки.
+            for follow in chunk:
+                follow.delete()
+        total += len(chunk)
+        log(f'Удалено подписок пользователя {user_id}: {total}')
+    _delete_chunks(TimelineEntry.objects.filter(user_id=user_id), chunk_size)
+    with transaction.atomic():
+        # Пока шла очистка, строки могли добавиться: помечаем их и
+        # удаляем пользователя при следующем проходе.
+        posts = Post.all_objects.filter(author_id=user_id)
+        comments = Comment.all_objects.filter(author_id=user_id)
+        if posts.exists() or comments.exists():
+            posts.update(is_deleted=True)
+            comments.update(is_deleted=True)
+            return False
+        User.objects.filter(pk=user_id).delete()
+    return True
+
+
+def _pending(kind, chunk_size):
+    return list(PendingDeletion.objects.filter(kind=kind).order_by(
+        'pk').values_list('pk', 'object_id')[:chunk_size])
+
+
+def purge(chunk_size=CHUNK_SIZE, log=None):
+    """Разбирает очередь удаления; возвращает число объектов по видам."""
+    log = log or (lambda message: None)
+    result = dict.fromkeys(('comments', 'posts', 'users'), 0)
+    for kind, key, model, purge_rows in (
+            (PendingDeletion.COMMENT, 'comments', Comment, _purge_comments),
+            (PendingDeletion.POST, 'posts', Post, _purge_posts)):
+        while True:
+            entries = _pending(kind, chunk_size)
+            if not entries:
+                break
+            result[key] += purge_rows(model.all_objects.filter(
+                pk__in=[object_id for _, object_id in entries]),
+                chunk_size, log)
+            PendingDeletion.objects.filter(
+                pk__in=[pk for pk, _ in entries]).delete()
+    for pk, user_id in _pending(PendingDeletion.USER, None):
+        if _purge_user(user_id, chunk_size, log):
+            PendingDeletion.objects.filter(pk=pk).delete()
+            result['users'] += 1
+            log(f'Удалён пользователь {user_id}')
+    return result
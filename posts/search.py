@@ -0,0 +1,197 @@
+"""
+Полнотекстовый поиск по постам и комментариям на SQLite FTS5.
+
+Тексты хранятся в виртуальной таблице posts_search уже приведёнными к
+основам слов, поэтому «котами» находит «кот» и «коты». rowid строки
+кодирует тип и id объекта, чтобы обновление и удаление шли по ключу.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+from .paginator import CursorPaginator
+
+TABLE = 'posts_search'
+
+POST = 'p'
+COMMENT = 'c'
+
+# Совпадение в комментарии ранжируется ниже совпадения в тексте поста.
+COMMENT_WEIGHT = 0.5
+
+WORD_RE = re.compile(r'\w+')
+
+# Окончания русских слов от длинных к коротким: «облегчённый» стемминг
+# в духе Портера, достаточный для поиска по словоформам.
+ENDINGS = sorted((
+    'ться', 'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ать', 'ять', 'ить',
+    'еть', 'тся', 'ешь', 'ете', 'ала', 'ила', 'ыла', 'ела', 'али', 'или',
+    'ыли', 'ели', 'ами', 'ями', 'ией', 'иям', 'иях', 'ием', 'ют', 'ут',
+    'ят', 'ат', 'ях', 'ах', 'ой', 'ей', 'ый', 'ий', 'ая', 'яя', 'ое', 'ее',
+    'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ов', 'ев', 'ия', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+MIN_STEM = 3
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize(text):
+    return ' '.join(stem(word) for word in WORD_RE.findall(text or ''))
+
+
+def match_expression(query):
+    """
+    Запрос пользователя -> выражение MATCH: все слова, основы точно.
+
+    Индекс и запрос приведены к основам одинаково, поэтому префикс не
+    нужен: "кот"* нашёл бы и «который», и «котёл».
+    """
+    stems = [stem(word) for word in WORD_RE.findall(query or '')]
+    return ' AND '.join(f'"{word}"' for word in stems if word)
+
+
+def _rowid(kind, object_id):
+    return object_id * 2 + (kind == COMMENT)
+
+
+def index(kind, object_id, post_id, text):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                       [_rowid(kind, object_id)])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, body, kind, object_id, post_id) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [_rowid(kind, object_id), normalize(text), kind, object_id,
+             post_id])
+
+
+def unindex(kind, object_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                       [_rowid(kind, object_id)])
+
+
+def unindex_author(user_id):
+    """Убирает из индекса все посты и комментарии пользователя."""
+    with connection.cursor() as cursor:
+        for model, kind in ((Post, POST), (Comment, COMMENT)):
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN ('
+                f'SELECT id * 2 + %s FROM {model._meta.db_table} '
+                f'WHERE author_id = %s)', [int(kind == COMMENT), user_id])
+
+
+def index_post(post):
+    index(POST, post.pk, post.pk, post.text)
+
+
+def index_comment(comment):
+    index(COMMENT, comment.pk, comment.post_id, comment.text)
+
+
+def rebuild():
+    """Заполняет индекс заново по всем постам и комментариям."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    for kind, rows in (
+            (POST, Post.objects.values_list('pk', 'pk', 'text')),
+            (COMMENT, Comment.objects.values_list('pk', 'post_id', 'text'))):
+        batch = []
+        for object_id, post_id, text in rows.iterator():
+            batch.append([_rowid(kind, object_id), normalize(text), kind,
+                          object_id, post_id])
+            if len(batch) >= 500:
+                _insert_many(batch)
+                batch = []
+        _insert_many(batch)
+
+
+def _insert_many(rows):
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, body, kind, object_id, post_id) '
+            f'VALUES (%s, %s, %s, %s, %s)', rows)
+
+
+def filter_queryset(queryset, query, kind):
+    """Ограничивает queryset объектами kind, найденными в индексе."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT object_id FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s AND kind = %s',
+        [expression, kind]))
+
+
+class SearchPaginator(CursorPaginator):
+    """Ранжированная выдача: по bm25 лучшего совпадения поста, затем id."""
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.for_feed(), per_page,
+                         ordering=('score', 'post_id'))
+        self.expression = match_expression(query)
+
+    def fetch(self, values, backward, limit):
+        if not self.expression:
+            return []
+        alias = router.db_for_read(Post)
+        rows = []
+        # Совпадения скрытых постов отбрасываются после выборки: добираем
+        # следующие, чтобы страница не вышла короче, пока выдача не кончилась.
+        while len(rows) < limit:
+            hits = self.hits(alias, values, backward, limit)
+            posts = self.object_list.using(alias).in_bulk(
+                [post_id for post_id, _ in hits])
+            rows += [((score, post_id), posts[post_id])
+                     for post_id, score in hits if post_id in posts]
+            if len(hits) < limit:
+                break
+            values = hits[-1][::-1]
+        return rows[:limit]
+
+    def hits(self, alias, values, backward, limit):
+        """До limit пар (id поста, оценка) за ключом values."""
+        params = [COMMENT_WEIGHT, self.expression]
+        seek = ''
+        if values is not None:
+            op = '<' if backward else '>'
+            seek = (f'WHERE score {op} %s '
+                    f'OR (score = %s AND post_id {op} %s)')
+            params += [values[0], values[0], values[1]]
+        order = 'DESC' if backward else 'ASC'
+        # LIMIT -1 не даёт SQLite встроить подзапрос в GROUP BY: bm25()
+        # можно вызывать только в запросе, который делает MATCH.
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, score FROM ('
+                f' SELECT post_id, MIN(hit_score) AS score FROM ('
+                f'  SELECT post_id, CASE kind WHEN \'{COMMENT}\''
+                f'   THEN bm25({TABLE}) * %s ELSE bm25({TABLE}) END'
+                f'   AS hit_score'
+                f'  FROM {TABLE} WHERE {TABLE} MATCH %s LIMIT -1'
+                f' ) GROUP BY post_id'
+                f') {seek} ORDER BY score {order}, post_id {order} LIMIT %s',
+                params + [limit])
+            return cursor.fetchall()
+
+    def deserialize(self, field, value):
+        if field == 'score':
+            return float(value)
+        return int(value)
+
+
+def get_page(query, cursor, per_page):
+    return SearchPaginator(query, per_page).get_page(cursor)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, groups, hot, images, search, timeline
+from .models import Comment, Follow, Group, GroupStats, Post, Profile
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    groups.forget(instance.slug)
+    old_slug = getattr(instance, '_saved_slug', None)
+    if old_slug and old_slug != instance.slug:
+        groups.forget(old_slug)
+    instance._saved_slug = instance.slug
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_init, sender=Group)
+def group_loaded(sender, instance, **kwargs):
+    instance._saved_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    groups.forget(instance.slug)
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Без обращения к атрибуту: отложенное поле не должно грузиться.
+    instance._saved_group_id = instance.__dict__.get('group_id')
+    # Из базы приходит строка; загруженный файл ещё не сохранён.
+    image = instance.__dict__.get('image')
+    instance._saved_image = image if isinstance(image, str) else None
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    search.index_post(instance)
+    if created:
+        counters.bump_profile(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+        hot.update(instance.pk)
+        if instance.group_id:
+            groups.post_published(instance)
+    elif instance._saved_group_id != instance.group_id:
+        groups.refresh(instance._saved_group_id)
+        groups.refresh(instance.group_id)
+    instance._saved_group_id = instance.group_id
+    if 'image' in instance.__dict__:
+        if instance._saved_image != instance.image.name:
+            images.release(instance._saved_image)
+        instance._saved_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.unindex(search.POST, instance.pk)
+    images.release(instance.image.name)
+    # Помеченный пост уже вычтен из счётчиков, их пересчитывает purge.
+    if not instance.is_deleted:
+        counters.bump_profile(instance.author_id, posts_count=-1)
+        groups.refresh(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    search.index_comment(instance)
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        hot.update(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    search.unindex(search.COMMENT, instance.pk)
+    if not instance.is_deleted:
+        counters.bump_comments(instance.post_id, -1)
+        hot.update(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.user_id, following_count=1)
+        counters.bump_profile(instance.author_id, followers_count=1)
+        timeline.followers_changed(instance.author_id, 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_profile(instance.user_id, following_count=-1)
+    counters.bump_profile(instance.author_id, followers_count=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.followers_changed(instance.author_id, -1)
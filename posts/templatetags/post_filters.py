@@ -0,0 +1,8 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def owned_by(post, user):
+    return user.is_authenticated and post.author_id == user.id
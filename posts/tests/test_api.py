@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group if number % 2 else None)
+            for number in range(13)]
+        cls.posts.reverse()
+
+    def get(self, name, params=None, **kwargs):
+        response = self.client.get(reverse(name, kwargs=kwargs), params)
+        return response, response.json()
+
+    def test_feeds_match_html_order(self):
+        """Ленты отдают те же посты и в том же порядке, что и HTML."""
+        self.client.force_login(self.reader)
+        feeds = {
+            'api_index': ({}, self.posts),
+            'api_group_posts': ({'slug': 'api-group'},
+                                [post for post in self.posts if post.group]),
+            'api_profile': ({'username': 'api_author'}, self.posts),
+            'api_follow_index': ({}, self.posts),
+        }
+        for name, (kwargs, expected) in feeds.items():
+            with self.subTest(feed=name):
+                ids, cursor = [], ''
+                while cursor is not None:
+                    _, data = self.get(name, {'cursor': cursor}, **kwargs)
+                    ids += [item['id'] for item in data['results']]
+                    cursor = data['next']
+                self.assertEqual(ids, [post.id for post in expected])
+
+    def test_fields_limit_columns(self):
+        """?fields= сужает и ответ, и SELECT."""
+        with CaptureQueriesContext(connection) as captured:
+            _, data = self.get('api_index', {'fields': 'id,author'})
+        self.assertEqual(data['results'][0],
+                         {'id': self.posts[0].id, 'author': 'api_author'})
+        self.assertEqual(len(captured), 1)
+        self.assertNotIn('"text"', captured[0]['sql'])
+
+    def test_unknown_field_is_rejected(self):
+        """Неизвестное поле - ошибка 400."""
+        response, data = self.get('api_index', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', data['detail'])
+
+    def test_follow_requires_login(self):
+        """Лента подписок без входа - 401."""
+        response, _ = self.get('api_follow_index')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_merges_heavy_authors(self):
+        """Посты «тяжёлых» авторов подмешиваются и в JSON-ленту."""
+        self.client.force_login(self.reader)
+        _, data = self.get('api_follow_index', {'fields': 'id'})
+        self.assertEqual([item['id'] for item in data['results']],
+                         [post.id for post in self.posts[:10]])
+
+    def test_post_with_comments(self):
+        """Пост отдаётся вместе с комментариями по порядку."""
+        post = self.posts[0]
+        comments = [Comment.objects.create(
+            post=post, author=self.reader, text=f'Комментарий {number}')
+            for number in range(3)]
+        _, data = self.get('api_post', username='api_author',
+                           post_id=post.id)
+        self.assertEqual(data['post']['text'], post.text)
+        self.assertEqual(data['post']['comments_count'], 3)
+        self.assertEqual([item['id'] for item in data['comments']['results']],
+                         [comment.id for comment in comments])
+
+    def test_missing_objects_return_404(self):
+        """Несуществующие автор, группа и пост - 404."""
+        for name, kwargs in (
+                ('api_profile', {'username': 'nobody'}),
+                ('api_group_posts', {'slug': 'nothing'}),
+                ('api_post', {'username': 'api_author', 'post_id': 0})):
+            with self.subTest(name=name):
+                response, _ = self.get(name, **kwargs)
+                self.assertEqual(response.status_code, 404)
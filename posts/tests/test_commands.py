@@ -0,0 +1,212 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import (Comment, Follow, Group, Post, Profile,
+                          TimelineEntry)
+
+User = get_user_model()
+
+
+class SeedAndBenchTest(TestCase):
+    def test_seed_creates_skewed_data(self):
+        """seed создаёт данные и пересчитывает производные таблицы."""
+        call_command('seed', users=30, groups=3, posts=200, comments=300,
+                     follows=100, images=0, celebrities=1,
+                     celebrity_reach=0.8, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        top = Profile.objects.order_by('-followers_count').first()
+        self.assertGreaterEqual(top.followers_count, 23)
+        self.assertEqual(top.followers_count,
+                         Follow.objects.filter(author=top.user).count())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            len(set(Post.objects.values_list('pub_date', flat=True))), 200)
+
+    def test_bench_reports_every_route(self):
+        """bench сохраняет метрики по каждому маршруту posts/urls.py."""
+        call_command('seed', users=10, groups=2, posts=40, comments=40,
+                     follows=30, images=0, celebrities=1, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench', requests=2, warmup=0, output=output,
+                         stdout=StringIO())
+            with open(output, encoding='utf-8') as report_file:
+                report = json.load(report_file)
+        routes = report['routes']
+        self.assertIn('index', routes)
+        self.assertIn('post_delete', routes)
+        for name, result in routes.items():
+            with self.subTest(route=name):
+                self.assertLess(max(result['status']), 500)
+                self.assertGreater(result['queries'], 0)
+        self.assertEqual(Post.objects.count(), 40)
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='exporter')
+        cls.group = Group.objects.create(
+            title='Группа', slug='export-group', description='Описание')
+        cls.posts = [Post.objects.create(
+            text=f'Пост {number}', author=cls.author,
+            group=cls.group if number % 2 else None)
+            for number in range(5)]
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.author, text='Комментарий')
+
+    def export(self, **options):
+        stdout = StringIO()
+        call_command('export_posts', stdout=stdout, **options)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_command_exports_author_in_chunks(self):
+        """Команда выгружает все посты автора при любом размере пачки."""
+        rows = self.export(author='exporter', chunk_size=2, comments=True)
+        self.assertEqual([row['id'] for row in rows],
+                         [post.id for post in self.posts])
+        self.assertEqual(rows[1]['comments'][0]['text'], 'Комментарий')
+        self.assertEqual(rows[0]['comments'], [])
+
+    def test_comments_merged_with_posts_in_two_queries(self):
+        """Комментарии всех постов читаются одним потоком в порядке id."""
+        for post in self.posts[2:4]:
+            for number in range(3):
+                Comment.objects.create(
+                    post=post, author=self.author, text=f'Ответ {number}')
+        posts = export.posts_for(username='exporter')
+        with self.assertNumQueries(2):
+            rows = [json.loads(line) for line in
+                    export.export_lines(posts, comments=True, chunk_size=1)]
+        self.assertEqual(
+            [[comment['text'] for comment in row['comments']]
+             for row in rows],
+            [[], ['Комментарий'], ['Ответ 0', 'Ответ 1', 'Ответ 2'],
+             ['Ответ 0', 'Ответ 1', 'Ответ 2'], []])
+
+    def test_command_exports_group(self):
+        """Выгрузка группы содержит только её посты и без комментариев."""
+        rows = self.export(group='export-group')
+        self.assertEqual([row['id'] for row in rows],
+                         [self.posts[1].id, self.posts[3].id])
+        self.assertNotIn('comments', rows[0])
+
+    def test_endpoint_streams_ndjson(self):
+        """Эндпоинт отдаёт NDJSON потоком и только вошедшим."""
+        url = reverse('export_author', kwargs={'username': 'exporter'})
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.author)
+        response = self.client.get(url, {'comments': 1})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertIn('comments', json.loads(lines[0]))
+
+
+class ImportTest(TestCase):
+    def write(self, directory, name, text):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(text)
+        return path
+
+    def test_import_keeps_dates_and_rebuilds_counters(self):
+        """Импорт сохраняет даты, пропускает битые ссылки, считает счётчики."""
+        User.objects.create_user(username='old_reader')
+        rows = [
+            {'type': 'post', 'id': 501, 'author': 'old_author',
+             'group': 'old-group', 'text': 'Старый пост',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'type': 'comment', 'post': 501, 'author': 'old_reader',
+             'text': 'Комментарий', 'created': '2015-03-02T10:00:00+00:00'},
+            {'type': 'comment', 'post': 999, 'author': 'old_reader',
+             'text': 'Комментарий к несуществующему посту'},
+            {'type': 'follow', 'user': 'old_reader', 'author': 'old_author'},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write(directory, 'data.ndjson', '\n'.join(
+                json.dumps(row, ensure_ascii=False) for row in rows))
+            stdout = StringIO()
+            call_command('import_data', path, batch_size=2,
+                         create_users=True, create_groups=True,
+                         stdout=stdout)
+        post = Post.objects.get(pk=501)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group.slug, 'old-group')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().created.day, 2)
+        self.assertEqual(post.author.profile.posts_count, 1)
+        self.assertEqual(post.author.profile.followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn('пропущено: 1', stdout.getvalue())
+
+    def test_import_csv(self):
+        """CSV импортируется с типом строк из --kind."""
+        User.objects.create_user(username='csv_author')
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write(
+                directory, 'posts.csv',
+                'author,text,pub_date\n'
+                'csv_author,Первый,2016-01-01T00:00:00\n'
+                'unknown,Без автора,2016-01-02T00:00:00\n')
+            call_command('import_data', path, kind='post', stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Первый'])
+
+    def test_rerun_skips_existing_ids(self):
+        """Повторный импорт с явными id пропускает загруженные строки."""
+        rows = [
+            {'type': 'post', 'id': 601, 'author': 'rerun_author',
+             'text': 'Пост'},
+            {'type': 'comment', 'id': 701, 'post': 601,
+             'author': 'rerun_author', 'text': 'Комментарий'},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write(directory, 'data.ndjson', '\n'.join(
+                json.dumps(row, ensure_ascii=False) for row in rows))
+            call_command('import_data', path, create_users=True,
+                         stdout=StringIO())
+            stdout = StringIO()
+            call_command('import_data', path, create_users=True,
+                         stdout=stdout)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertIn('пропущено: 2', stdout.getvalue())
+
+    def test_malformed_row_reports_line(self):
+        """Битое значение в строке даёт ошибку с номером строки."""
+        User.objects.create_user(username='csv_author')
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write(
+                directory, 'comments.csv',
+                'post,author,text\n'
+                'abc,csv_author,Комментарий\n')
+            with self.assertRaisesMessage(
+                    CommandError, f'{path}:2: неверное значение post'):
+                call_command('import_data', path, kind='comment',
+                             stdout=StringIO())
+
+
+class ConcurrencyBenchTest(TransactionTestCase):
+    def test_reads_proceed_during_writes(self):
+        """Чтения идут параллельно с записью, записи бенчмарка удаляются."""
+        call_command('seed', users=5, groups=1, posts=10, comments=5,
+                     follows=5, images=0, celebrities=1, stdout=StringIO())
+        stdout = StringIO()
+        call_command('bench_concurrency', readers=2, writers=2,
+                     duration=0.5, stdout=stdout)
+        self.assertIn('ошибок: 0', stdout.getvalue())
+        self.assertNotIn('Чтений во время записи: 0,', stdout.getvalue())
+        self.assertEqual(Post.objects.count(), 10)
+        self.assertEqual(Comment.objects.count(), 5)
@@ -1,8 +1,19 @@
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from PIL import Image
 
+from posts import images, purge, thumbnails
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -12,6 +23,10 @@ class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
+        # Картинки и миниатюры пишутся во временный каталог, не в static.
+        cls.media = tempfile.TemporaryDirectory()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media.name)
+        cls.media_override.enable()
         cls.small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
             b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -39,6 +54,12 @@ class PostFormTests(TestCase):
             group=cls.group
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        cls.media.cleanup()
+        super().tearDownClass()
+
     def setUp(self):
         self.authorized_client = Client()
         self.authorized_client.force_login(self.author)
@@ -148,3 +169,117 @@ class PostFormTests(TestCase):
         self.assertEqual(test_post.group, self.test_group)
         self.assertEqual(test_post.author, self.test_user)
         self.assertEqual(response.status_code, 200)
+
+
+class ImageUploadTests(TransactionTestCase):
+    """Транзакционный тест: файлы удаляются в on_commit."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.author = User.objects.create(username='photographer')
+        self.client.force_login(self.author)
+
+    def upload(self, name='photo.jpg', size=(3000, 1500), exif=True):
+        buffer = BytesIO()
+        image = Image.new('RGB', size, 'red')
+        if exif:
+            data = image.getexif()
+            data[0x0112] = 6  # Повёрнуто на 90 градусов.
+            data[0x010F] = 'Camera'
+            image.save(buffer, 'JPEG', exif=data)
+        else:
+            image.save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(),
+                                  content_type='image/jpeg')
+
+    def create(self, upload):
+        self.client.post(reverse('new_post'),
+                         {'text': 'Пост с фото', 'image': upload})
+        return Post.objects.order_by('-id').first()
+
+    def test_upload_is_normalized(self):
+        """Картинка развёрнута по EXIF, уменьшена и сохранена без EXIF."""
+        post = self.create(self.upload())
+        max_width, max_height = settings.POST_IMAGE_MAX_SIZE
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertLessEqual(image.width, max_width)
+            self.assertLessEqual(image.height, max_height)
+            self.assertLess(image.width, image.height)
+            self.assertFalse(image.getexif())
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом с именем по хешу."""
+        first = self.create(self.upload())
+        second = self.create(self.upload('copy.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name,
+                         r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется только вместе с последним ссылающимся постом."""
+        first = self.create(self.upload())
+        second = self.create(self.upload('copy.jpg'))
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_image_released(self):
+        """Заменённая при редактировании картинка удаляется с диска."""
+        post = self.create(self.upload())
+        path = post.image.path
+        self.client.post(
+            reverse('post_edit', kwargs={'username': self.author.username,
+                                         'post_id': post.id}),
+            {'text': post.text, 'image': self.upload(exif=False)})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.path, path)
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertFalse(os.path.exists(path))
+
+    def test_hidden_post_image_not_served(self):
+        """Картинку только скрытого поста и её миниатюры не отдают."""
+        post = self.create(self.upload())
+        thumbnail = thumbnails.generate(post)['480']
+        self.assertEqual(self.client.get(post.image.url).status_code, 200)
+        self.assertEqual(self.client.get(thumbnail).status_code, 200)
+        purge.delete_post(post)
+        self.assertEqual(self.client.get(post.image.url).status_code, 404)
+        self.assertEqual(self.client.get(thumbnail).status_code, 404)
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_shared_image_served_while_visible(self):
+        """Картинку, которую показывает видимый пост, отдают дальше."""
+        first = self.create(self.upload())
+        second = self.create(self.upload('copy.jpg'))
+        thumbnail = thumbnails.generate(second)['480']
+        purge.delete_post(first)
+        self.assertEqual(self.client.get(second.image.url).status_code, 200)
+        self.assertEqual(self.client.get(thumbnail).status_code, 200)
+
+    def test_release_waits_for_concurrent_save(self):
+        """Удаление файла ждёт пост, который сохраняет ту же картинку."""
+        post = self.create(self.upload())
+        name, path = post.image.name, post.image.path
+        Post.objects.filter(pk=post.pk).update(image='')
+
+        def release():
+            try:
+                images._release(name)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=release)
+        with transaction.atomic():
+            # Хранилище нашло файл и вернуло его имя, пост ещё не записан.
+            Post.objects.create(text='Копия', author=self.author, image=name)
+            thread.start()
+            time.sleep(0.3)
+        thread.join()
+        self.assertTrue(os.path.exists(path))
@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import purge, search
+from posts.models import (Comment, Follow, Group, GroupStats,
+                          PendingDeletion, Post, Profile, TimelineEntry)
+
+User = get_user_model()
+
+
+class SoftDeleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='purge_author')
+        cls.reader = User.objects.create_user(username='purge_reader')
+        cls.group = Group.objects.create(title='Группа', slug='purge-group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост про котов', author=cls.author, group=cls.group)
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {number}')
+            for number in range(5)]
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def post_url(self, post):
+        return reverse('post', kwargs={'username': post.author.username,
+                                       'post_id': post.id})
+
+    def test_deleted_post_hidden_at_once(self):
+        """Удалённый пост сразу пропадает, строка остаётся до очистки."""
+        self.client.force_login(self.author)
+        self.client.get(reverse('post_delete', kwargs={
+            'username': self.author.username, 'post_id': self.post.id}))
+        self.assertEqual(self.client.get(
+            self.post_url(self.post)).status_code, 404)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+        self.assertEqual(self.profile(self.author).posts_count, 0)
+        self.assertEqual(GroupStats.objects.get(
+            group=self.group).posts_count, 0)
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('follow_index'))
+        self.assertNotContains(response, 'Пост про котов')
+        self.assertTrue(PendingDeletion.objects.filter(
+            kind=PendingDeletion.POST, object_id=self.post.pk).exists())
+
+    def test_purge_removes_post_with_dependents(self):
+        """Очистка удаляет пост, комментарии, ленты и поисковый индекс."""
+        purge.delete_post(self.post)
+        result = purge.purge(chunk_size=2)
+        self.assertEqual(result['posts'], 1)
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.all_objects.exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            post_id=self.post.pk).exists())
+        self.assertFalse(search.filter_queryset(
+            Comment.all_objects.all(), 'Комментарий', search.COMMENT
+        ).exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        self.assertEqual(self.profile(self.author).posts_count, 0)
+
+    def test_deleted_comment_counted_once(self):
+        """Счётчик поста уменьшается при пометке и не дважды при очистке."""
+        purge.delete_comment(self.comments[0])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+        self.assertEqual(self.post.comments.count(), 4)
+        purge.purge()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+        self.assertEqual(Comment.all_objects.count(), 4)
+
+    def test_deleted_user_purged_in_chunks(self):
+        """Удалённый пользователь скрыт сразу и удаляется пачками."""
+        other_post = Post.objects.create(text='Чужой', author=self.reader)
+        Comment.objects.create(post=other_post, author=self.author,
+                               text='Ответ автора')
+        self.author.set_password('password')
+        self.author.save()
+        purge.delete_user(self.author)
+        self.assertEqual(self.client.get(reverse(
+            'profile', kwargs={'username': self.author.username}
+        )).status_code, 404)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        self.assertFalse(self.client.login(username='purge_author',
+                                           password='password'))
+        other_post.refresh_from_db()
+        self.assertEqual(other_post.comments_count, 0)
+        self.assertFalse(search.filter_queryset(
+            Post.objects.all(), 'Ответ автора', search.POST).exists())
+        self.assertEqual(search.get_page('котов', None, 10).object_list, [])
+        stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertNotIn('purge_author', stats.recent_poster_names)
+
+        output = StringIO()
+        call_command('purge_deleted', chunk_size=2, stdout=output)
+        self.assertIn('Удалено комментариев: 2', output.getvalue())
+        self.assertIn('пользователей 1', output.getvalue())
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Comment.all_objects.filter(
+            author_id=self.author.pk).exists())
+        other_post.refresh_from_db()
+        self.assertEqual(other_post.comments_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+        self.assertEqual(self.profile(self.reader).posts_count, 1)
+
+    def test_deleted_user_comment_changes_post_etag(self):
+        """Скрытие комментариев удалённого пользователя меняет ETag поста."""
+        post = Post.objects.create(text='Чужой', author=self.reader)
+        Comment.objects.create(post=post, author=self.author,
+                               text='Ответ автора')
+        url = self.post_url(post)
+        etag = self.client.get(url)['ETag']
+        purge.delete_user(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Ответ автора')
+
+    def test_admin_delete_is_soft(self):
+        """Удаление в админке только помечает пост."""
+        admin = User.objects.create_superuser(
+            'purge_admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        url = reverse('admin:posts_post_delete', args=[self.post.pk])
+        self.assertContains(self.client.get(url), 'Пост про котов')
+        self.client.post(url, {'post': 'yes'})
+        self.assertTrue(Post.all_objects.get(pk=self.post.pk).is_deleted)
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
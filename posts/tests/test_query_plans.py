@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def bad_plan_steps(sql, ordered_scans=()):
+    """
+    Шаги плана со сканированием таблицы или сортировкой в памяти.
+
+    Допустим только SEARCH по ключу индекса. SCAN по индексу проходит,
+    лишь если таблица в ordered_scans и запрос ограничен LIMIT: так
+    читается начало общей ленты в нужном порядке. SCAN ... USING INDEX
+    без этих условий - полный проход индекса, а не поиск.
+    """
+    if search.TABLE in sql:
+        # Выдачу поиска ранжирует bm25 по найденным строкам: сортировка
+        # в памяти здесь неизбежна и ограничена числом совпадений.
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        steps = [row[-1] for row in cursor.fetchall()]
+    bounded = ' LIMIT ' in sql
+    bad = []
+    for step in steps:
+        if 'USE TEMP B-TREE' in step:
+            bad.append(step)
+        elif step.startswith('SCAN ') and 'VIRTUAL TABLE' not in step:
+            table = step.split()[1]
+            if not (bounded and table in ordered_scans
+                    and ' USING ' in step):
+                bad.append(step)
+    return bad
+
+
+class QueryPlanTest(TestCase):
+    """Каждый запрос страниц ленты идёт по индексу, без сортировки в памяти."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='plan_author')
+        cls.reader = User.objects.create_user(username='plan_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='plan-group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            cls.post = Post.objects.create(
+                text=f'Пост про кота {number}', author=cls.author,
+                group=cls.group)
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+        for number in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Ответ {number}')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        """URL и таблицы, которые страница читает по порядку индекса."""
+        post = {'username': 'plan_author', 'post_id': self.post.id}
+        yield reverse('index'), {'posts_post'}
+        yield reverse('hot_posts'), {'posts_postscore'}
+        yield reverse('group_list'), {'posts_group'}
+        yield reverse('group_posts', kwargs={'slug': 'plan-group'}), ()
+        yield reverse('profile', kwargs={'username': 'plan_author'}), ()
+        yield reverse('post', kwargs=post), ()
+        yield reverse('post_comments', kwargs=post), ()
+        yield reverse('follow_index'), ()
+        yield reverse('search') + '?q=кот', ()
+        yield reverse('api_index'), {'posts_post'}
+        yield reverse('api_group_posts', kwargs={'slug': 'plan-group'}), ()
+        yield reverse('api_profile', kwargs={'username': 'plan_author'}), ()
+        yield reverse('api_follow_index'), ()
+        yield reverse('api_post', kwargs=post), ()
+
+    def next_cursor(self, url, response):
+        if 'api' in url:
+            return response.json().get('next')
+        for name in ('page', 'comments'):
+            if response.context and name in response.context:
+                return response.context[name].next_cursor
+        return None
+
+    def assert_plans_use_indexes(self):
+        for url, ordered_scans in self.urls():
+            with CaptureQueriesContext(connection) as captured:
+                first = self.client.get(url)
+                cursor = self.next_cursor(url, first)
+                if cursor:
+                    self.client.get(url, {'cursor': cursor})
+                if first.has_header('ETag'):
+                    self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            for query in captured:
+                with self.subTest(url=url, sql=query['sql']):
+                    self.assertEqual(
+                        bad_plan_steps(query['sql'], ordered_scans), [])
+
+    def test_view_queries_use_indexes(self):
+        """Ни один запрос страниц не сканирует таблицу и не сортирует."""
+        self.assert_plans_use_indexes()
+
+    def test_anonymous_queries_use_indexes(self):
+        """Валидаторы условных GET для гостей тоже идут по индексу."""
+        self.client.logout()
+        self.assert_plans_use_indexes()
@@ -1,11 +1,25 @@
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
 
-from posts.models import Post, Group, Comment, Follow
+from posts import search, thumbnails
+from posts.models import (Post, PostScore, Group, GroupStats, Comment,
+                          Follow, Profile, TimelineEntry)
+from yatube2.settings import COMMENTS_PER_PAGE
 
 
 User = get_user_model()
@@ -17,6 +31,10 @@ class PostsPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
+        # Картинки и миниатюры пишутся во временный каталог, не в static.
+        cls.media = tempfile.TemporaryDirectory()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media.name)
+        cls.media_override.enable()
         small_jpg = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
             b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -50,6 +68,12 @@ class PostsPagesTests(TestCase):
             image=PostsPagesTests.uploaded
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        cls.media.cleanup()
+        super().tearDownClass()
+
     def setUp(self):
         self.guest_client = Client()
         self.authorized_client = Client()
@@ -113,18 +137,81 @@ class PostsPagesTests(TestCase):
         self.assertEqual(response_page_not_found.status_code, 404)
 
     def test_cache_index(self):
-        """Проверяем создается ли кеш главной страницы"""
-        client = Client()
-        user = User.objects.create_user(username='dmitriy',
-                                        password='novikov')
-        client.force_login(user)
+        """Карточки постов главной страницы попадают в кеш."""
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+        key = make_template_fragment_key(
+            'post_card', [self.post.id, self.post.updated.timestamp(), False,
+                          self.user.username, None, '', ''])
+        self.assertTrue(cache.has_key(key))
+
+    def test_post_card_cache_invalidated_on_edit(self):
+        """Правка поста сразу видна на закешированной главной странице."""
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+        self.authorized_client.post(
+            reverse('post_edit', kwargs={'username': self.user.username,
+                                         'post_id': self.post.id}),
+            data={'text': 'Отредактированный текст'})
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Отредактированный текст')
+
+    def test_post_card_cache_invalidated_on_comment(self):
+        """Новый комментарий сразу меняет счётчик в карточке поста."""
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+        self.authorized_client.post(
+            reverse('add_comment', kwargs={'username': self.user.username,
+                                           'post_id': self.post.id}),
+            data={'text': 'Комментарий'})
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_post_card_cache_varies_for_author(self):
+        """Автор видит кнопки управления даже после кеширования карточки."""
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'Редактировать')
+
+    def test_post_card_cache_follows_group_changes(self):
+        """Переименование и удаление группы видны в карточке поста."""
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.slug = 'new-slug'
+        group.save()
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, '#Новое название')
+        self.assertContains(response, reverse(
+            'group_posts', kwargs={'slug': 'new-slug'}))
+        group.delete()
+        response = self.guest_client.get(reverse('index'))
+        self.assertNotContains(response, '#Новое название')
+
+    def test_post_card_cache_follows_username_change(self):
+        """Новое имя автора сразу попадает в ссылки карточки."""
         cache.clear()
-        client.post(reverse('new_post'), {'author': user,
-                                          'text': 'test_cache'}, follow=True)
-        Post.objects.get(author=user)
-        x = cache.get('index_page')
-        x = cache._cache.keys()
-        self.assertIn('index_page', f'{x}')
+        self.guest_client.get(reverse('index'))
+        author = User.objects.get(pk=self.user.pk)
+        author.username = 'renamed'
+        author.save()
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, reverse(
+            'profile', kwargs={'username': 'renamed'}))
+        self.assertContains(response, '@renamed')
+
+    def test_post_card_uses_precomputed_thumbnails(self):
+        """Карточка выводит готовые миниатюры разных ширин в srcset."""
+        cache.clear()
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        urls = thumbnails.generate(self.post)
+        self.assertEqual(set(urls), {'480', '960', '1440'})
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, f'src="{urls["960"]}"')
+        self.assertContains(response, f'{urls["1440"]} 1440w')
 
 
 class PaginatorViewsTest(TestCase):
@@ -146,10 +233,46 @@ class PaginatorViewsTest(TestCase):
 
     def test_second_page_contains_five_records(self):
         """Работа пагинатора на второй странице с 5-тью записями"""
+        first_page = self.authorized_client.get(
+            reverse('index')).context.get('page')
         response = self.authorized_client.get(
-            reverse('index') + '?page=2'
+            reverse('index') + f'?cursor={first_page.next_cursor}'
         )
-        self.assertEqual(len(response.context.get('page').object_list), 5)
+        page = response.context.get('page')
+        self.assertEqual(len(page.object_list), 5)
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_cursor_is_stable_after_new_posts(self):
+        """Новые записи не сдвигают следующую страницу ленты."""
+        first_page = self.authorized_client.get(
+            reverse('index')).context.get('page')
+        Post.objects.create(text='Свежий пост', author=self.user)
+        response = self.authorized_client.get(
+            reverse('index') + f'?cursor={first_page.next_cursor}')
+        page = response.context.get('page')
+        self.assertEqual(len(page.object_list), 5)
+        self.assertFalse(set(page.object_list) & set(first_page))
+
+    def test_previous_cursor_returns_first_page(self):
+        """Ссылка «Предыдущая» возвращает на первую страницу."""
+        first_page = self.authorized_client.get(
+            reverse('index')).context.get('page')
+        second_page = self.authorized_client.get(
+            reverse('index') + f'?cursor={first_page.next_cursor}'
+        ).context.get('page')
+        response = self.authorized_client.get(
+            reverse('index') + f'?cursor={second_page.previous_cursor}')
+        page = response.context.get('page')
+        self.assertEqual(page.object_list, first_page.object_list)
+        self.assertFalse(page.has_previous())
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.authorized_client.get(
+            reverse('index') + '?cursor=broken')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context.get('page').object_list), 10)
 
 
 class TestComment(TestCase):
@@ -250,3 +373,437 @@ class TestFollow(TestCase):
 
         response = self.client.get(reverse('follow_index'))
         self.assertNotContains(response, TestFollow.post.text)
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в материализованную ленту подписчика."""
+        Follow.objects.create(
+            user=TestFollow.user_follower, author=TestFollow.user_following)
+        post = Post.objects.create(
+            text='Пост после подписки', author=TestFollow.user_following)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TestFollow.user_follower, post=post).exists())
+        response = self.client_auth.get(reverse('follow_index'))
+        self.assertEqual(response.context['page'].object_list,
+                         [post, TestFollow.post])
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка удаляет посты автора из ленты."""
+        Follow.objects.create(
+            user=TestFollow.user_follower, author=TestFollow.user_following)
+        self.client_auth.get(reverse(
+            'profile_unfollow', kwargs={
+                'username': TestFollow.user_following.username}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=TestFollow.user_follower).exists())
+        response = self.client_auth.get(reverse('follow_index'))
+        self.assertNotContains(response, TestFollow.post.text)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_posts_merged_on_read(self):
+        """Посты автора с большой аудиторией подмешиваются при чтении."""
+        Follow.objects.create(
+            user=TestFollow.user_follower, author=TestFollow.user_following)
+        post = Post.objects.create(
+            text='Пост популярного автора', author=TestFollow.user_following)
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.client_auth.get(reverse('follow_index'))
+        self.assertEqual(response.context['page'].object_list,
+                         [post, TestFollow.post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_crossing_fanout_limit(self):
+        """Переход автора через лимит в обе стороны не теряет посты."""
+        author = TestFollow.user_following
+        first, second, third = (
+            User.objects.create_user(username=f'crossing_{number}')
+            for number in range(3))
+        Follow.objects.create(user=first, author=author)
+        Follow.objects.create(user=second, author=author)
+        self.assertTrue(TimelineEntry.objects.filter(author=author).exists())
+        Follow.objects.create(user=third, author=author)
+        self.assertFalse(TimelineEntry.objects.filter(author=author).exists())
+        post = Post.objects.create(text='Пост тяжёлого автора', author=author)
+
+        Follow.objects.filter(user=second, author=author).delete()
+        for reader in (first, third):
+            with self.subTest(reader=reader.username):
+                self.assertEqual(set(TimelineEntry.objects.filter(
+                    user=reader).values_list('post_id', flat=True)),
+                    {post.id, TestFollow.post.id})
+                self.client.force_login(reader)
+                response = self.client.get(reverse('follow_index'))
+                self.assertEqual(response.context['page'].object_list,
+                                 [post, TestFollow.post])
+
+
+class FeedQueryBudgetTest(TestCase):
+    """Число SQL-запросов ленты не зависит от числа постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='budget_author')
+        cls.reader = User.objects.create_user(username='budget_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget-group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for count in range(15):
+            post = Post.objects.create(
+                text=f'Пост {count}', author=cls.author, group=cls.group)
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_feed_query_budget(self):
+        """Ленты укладываются в фиксированный бюджет запросов."""
+        budgets = {
+            reverse('index'): 3,
+            reverse('group_posts', kwargs={'slug': 'budget-group'}): 4,
+            reverse('profile', kwargs={'username': 'budget_author'}): 5,
+            reverse('follow_index'): 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertContains(response, 'Комментариев: 1')
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counter_author')
+        cls.reader = User.objects.create_user(username='counter_reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_comment_updates_post_counter(self):
+        """Комментарий увеличивает сохранённый счётчик поста."""
+        self.client.post(
+            reverse('add_comment', kwargs={
+                'username': self.author.username, 'post_id': self.post.id}),
+            data={'text': 'Комментарий'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_follow_and_unfollow_update_profiles(self):
+        """Подписка и отписка меняют счётчики обоих профилей."""
+        kwargs = {'username': self.author.username}
+        self.client.get(reverse('profile_follow', kwargs=kwargs))
+        self.assertEqual(self.profile(self.author).followers_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        self.client.get(reverse('profile_unfollow', kwargs=kwargs))
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+
+    def test_new_post_and_delete_update_posts_count(self):
+        """Публикация и удаление поста меняют счётчик записей автора."""
+        self.client.post(reverse('new_post'), data={'text': 'Новый пост'})
+        self.assertEqual(self.profile(self.reader).posts_count, 1)
+        post = Post.objects.get(author=self.reader)
+        self.client.get(reverse('post_delete', kwargs={
+            'username': self.reader.username, 'post_id': post.id}))
+        self.assertEqual(self.profile(self.reader).posts_count, 0)
+
+    def test_recount_command_fixes_drift(self):
+        """Команда recount_counters исправляет разошедшиеся счётчики."""
+        Profile.objects.filter(user=self.author).update(posts_count=42)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        call_command('recount_counters', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+        cls.cat_post = Post.objects.create(
+            text='Мой кот любит спать на подоконнике', author=cls.user)
+        cls.dog_post = Post.objects.create(
+            text='Собака гуляет во дворе', author=cls.user)
+        Comment.objects.create(
+            post=cls.dog_post, author=cls.user, text='Коты лучше собак')
+
+    def search(self, query, cursor=''):
+        response = self.client.get(
+            reverse('search'), {'q': query, 'cursor': cursor})
+        return response.context['page']
+
+    def test_search_matches_word_forms(self):
+        """Поиск находит другие словоформы и совпадения в комментариях."""
+        page = self.search('котами')
+        self.assertEqual(page.object_list, [self.cat_post, self.dog_post])
+
+    def test_search_matches_whole_stems(self):
+        """Основа ищется целиком, а не как начало другого слова."""
+        Post.objects.create(text='Пост, который про котёл', author=self.user)
+        page = self.search('кот')
+        self.assertEqual(page.object_list, [self.cat_post, self.dog_post])
+
+    def test_search_follows_index_updates(self):
+        """Правка и удаление поста сразу отражаются в выдаче."""
+        post = Post.objects.get(pk=self.cat_post.pk)
+        post.text = 'Попугай'
+        post.save()
+        self.assertEqual(self.search('попугаи').object_list, [post])
+        post.delete()
+        self.assertEqual(self.search('попугай').object_list, [])
+
+    def test_search_is_cursor_paginated(self):
+        """Выдача листается курсором без повторов."""
+        for count in range(12):
+            Post.objects.create(text=f'Кошка номер {count}', author=self.user)
+        first = self.search('кошка')
+        second = self.search('кошка', first.next_cursor)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+
+    def test_search_page_refilled_past_hidden_posts(self):
+        """Скрытые посты в индексе не укорачивают страницу выдачи."""
+        hidden = [Post.objects.create(text='Рыба', author=self.user)
+                  for _ in range(15)]
+        visible = [Post.objects.create(text='Рыба плывёт в море',
+                                       author=self.user)
+                   for _ in range(5)]
+        Post.objects.filter(pk__in=[post.pk for post in hidden]).update(
+            is_deleted=True)
+        page = self.search('рыба')
+        self.assertEqual(set(page.object_list), set(visible))
+        self.assertIsNone(page.next_cursor)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке отбирает посты по индексу."""
+        queryset = search.filter_queryset(
+            Post.objects.all(), 'собаки', search.POST)
+        self.assertEqual(list(queryset), [self.dog_post])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag-group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+        cls.urls = {
+            'post': reverse('post', kwargs={
+                'username': 'etag_author', 'post_id': cls.post.id}),
+            'profile': reverse('profile', kwargs={'username': 'etag_author'}),
+            'group': reverse('group_posts', kwargs={'slug': 'etag-group'}),
+        }
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменившаяся страница отдаётся анониму как 304."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                with self.assertNumQueries(2 if name == 'profile' else 1):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_comment_invalidates_post_etag(self):
+        """Новый комментарий меняет версию страницы поста."""
+        etag = self.client.get(self.urls['post'])['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий')
+        response = self.client.get(
+            self.urls['post'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleting_older_post_invalidates_lists(self):
+        """Удаление не самого свежего поста меняет версию списков."""
+        older = Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group)
+        Post.objects.filter(pk=older.pk).update(updated=self.post.updated)
+        Post.objects.filter(pk=self.post.pk).update(updated=timezone.now())
+        etags = {name: self.client.get(self.urls[name])['ETag']
+                 for name in ('profile', 'group')}
+        older.delete()
+        for name, etag in etags.items():
+            with self.subTest(page=name):
+                response = self.client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_group_edit_invalidates_group_etag(self):
+        """Правка описания группы меняет версию её страницы."""
+        etag = self.client.get(self.urls['group'])['ETag']
+        Group.objects.filter(pk=self.group.pk).update(
+            description='Новое описание')
+        response = self.client.get(
+            self.urls['group'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_alone_never_stale(self):
+        """Клиент только с If-Modified-Since получает новую страницу."""
+        since = http_date(time.time() + 60)
+        Follow.objects.create(
+            user=User.objects.create_user(username='etag_reader'),
+            author=self.author)
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_users_get_full_page(self):
+        """Вошедшим пользователям валидаторы не отдаются."""
+        self.client.force_login(self.author)
+        response = self.client.get(self.urls['post'])
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_missing_objects_still_404(self):
+        """Для несуществующих страниц по-прежнему 404."""
+        response = self.client.get(
+            reverse('profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        cls.comments = [Comment.objects.create(
+            post=cls.post, author=cls.user, text=f'Комментарий {number}')
+            for number in range(COMMENTS_PER_PAGE * 2 + 1)]
+        cls.comments.reverse()
+        cls.kwargs = {'username': 'commenter', 'post_id': cls.post.id}
+
+    def test_post_page_renders_first_batch(self):
+        """Страница поста показывает только первую порцию комментариев."""
+        response = self.client.get(reverse('post', kwargs=self.kwargs))
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:COMMENTS_PER_PAGE])
+        self.assertContains(response, 'js-more-comments')
+        # Догрузка не зависит от jQuery, которого в статике нет.
+        self.assertContains(response, 'fetch(link.dataset.fragment')
+
+    def test_fragment_returns_next_batches(self):
+        """Фрагмент по курсору отдаёт следующие порции без повторов."""
+        url = reverse('post_comments', kwargs=self.kwargs)
+        cursor, seen = '', []
+        while cursor is not None:
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertNotContains(response, '<html')
+            page = response.context['comments']
+            seen += list(page)
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.comments)
+
+
+class HotPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='hot_author')
+        cls.quiet = Post.objects.create(text='Тихий пост', author=cls.user)
+        cls.busy = Post.objects.create(text='Обсуждаемый', author=cls.user)
+
+    def hot_feed(self):
+        return list(self.client.get(reverse('hot_posts')).context['page'])
+
+    def test_comments_raise_post_incrementally(self):
+        """Комментарии сразу поднимают пост в ленте популярного."""
+        Post.objects.filter(pk=self.busy.pk).update(
+            pub_date=timezone.now() - timedelta(hours=3))
+        call_command('recompute_hot', stdout=StringIO())
+        self.assertEqual(self.hot_feed(), [self.quiet, self.busy])
+        for number in range(5):
+            Comment.objects.create(
+                post=self.busy, author=self.user, text=f'Ответ {number}')
+        self.assertEqual(self.hot_feed(), [self.busy, self.quiet])
+
+    def test_recompute_drops_old_posts(self):
+        """Пересчёт убирает посты старше окна и обновляет затухание."""
+        Post.objects.filter(pk=self.quiet.pk).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        before = PostScore.objects.get(post=self.busy).score
+        Post.objects.filter(pk=self.busy.pk).update(
+            pub_date=timezone.now() - timedelta(days=1))
+        call_command('recompute_hot', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.hot_feed(), [self.busy])
+        self.assertLess(PostScore.objects.get(post=self.busy).score, before)
+
+
+class GroupDirectoryTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first = User.objects.create_user(username='first_poster')
+        cls.second = User.objects.create_user(username='second_poster')
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котов')
+        cls.other = Group.objects.create(
+            title='Собаки', slug='dogs', description='Про собак')
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_stats_follow_posts(self):
+        """Сводка группы меняется при публикации, переносе и удалении."""
+        Post.objects.create(text='Раз', author=self.first, group=self.group)
+        post = Post.objects.create(
+            text='Два', author=self.second, group=self.group)
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.last_post_at, post.pub_date)
+        self.assertEqual(stats.recent_poster_names,
+                         ['second_poster', 'first_poster'])
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other
+        post.save()
+        self.assertEqual(self.stats(self.group).posts_count, 1)
+        self.assertEqual(self.stats(self.other).recent_poster_names,
+                         ['second_poster'])
+        post.delete()
+        self.assertEqual(self.stats(self.other).posts_count, 0)
+        self.assertIsNone(self.stats(self.other).last_post_at)
+
+    def test_directory_reads_summary(self):
+        """Каталог выводит сводку без агрегатов по постам."""
+        Post.objects.create(text='Раз', author=self.first, group=self.group)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('group_list'))
+        self.assertContains(response, 'Записей: 1')
+        self.assertContains(response, '@first_poster')
+        self.assertFalse(any('COUNT(' in query['sql'].upper()
+                             for query in captured))
+
+    def test_slug_cache_invalidated_on_save(self):
+        """Переименованная группа открывается по новому адресу."""
+        url = reverse('group_posts', kwargs={'slug': 'cats'})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'kittens'
+        group.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(
+            reverse('group_posts', kwargs={'slug': 'kittens'}))
+        self.assertEqual(response.context['group'].slug, 'kittens')
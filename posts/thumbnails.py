@@ -0,0 +1,63 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails')
+    return _executor
+
+
+def geometry(width):
+    base_width, base_height = settings.POST_THUMBNAIL_SIZE
+    return f'{width}x{round(width * base_height / base_width)}'
+
+
+def generate(post):
+    """Создаёт миниатюры всех размеров и сохраняет их адреса в посте."""
+    if not post.image:
+        return {}
+    urls = {
+        str(width): get_thumbnail(post.image, geometry(width),
+                                  crop='center', upscale=True).url
+        for width in settings.POST_THUMBNAIL_WIDTHS}
+    # Картинку могли заменить, пока мы считали, - тогда не затираем.
+    Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        thumbnails=json.dumps(urls), updated=timezone.now())
+    return urls
+
+
+def _generate_by_pk(pk):
+    close_old_connections()
+    try:
+        post = Post.objects.filter(pk=pk).first()
+        if post is not None:
+            generate(post)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры поста %s', pk)
+    finally:
+        close_old_connections()
+
+
+def schedule(post):
+    """Сбрасывает старые миниатюры и ставит новые в очередь пула."""
+    Post.objects.filter(pk=post.pk).update(thumbnails='')
+    post.thumbnails = ''
+    if post.image:
+        transaction.on_commit(
+            lambda: get_executor().submit(_generate_by_pk, post.pk))
@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, Profile, TimelineEntry
+from .paginator import CursorPaginator
+
+BATCH_SIZE = 500
+
+POST_ORDERING = ('pub_date', 'id')
+
+
+def is_heavy(author_id):
+    """Автор с числом подписчиков больше лимита не рассылается по лентам."""
+    return Profile.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).exists()
+
+
+def heavy_authors(user_id):
+    """Авторы из подписок пользователя, чьи посты собираются при чтении."""
+    return list(Follow.objects.filter(
+        user_id=user_id,
+        author__profile__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('author_id', flat=True))
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    if is_heavy(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post.id,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers.iterator())
+
+
+def backfill(user_id, author_id):
+    if is_heavy(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('id', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id,
+                      author_id=author_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator())
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя целиком, например после импорта."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True)
+    for author_id in authors.iterator():
+        backfill(user_id, author_id)
+
+
+def _fill(where, params):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR IGNORE INTO {TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, author_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            f'ON post.author_id = follow.author_id '
+            f'WHERE NOT post.is_deleted AND {where}', params)
+
+
+def rebuild_all():
+    """Пересобирает все ленты одним INSERT ... SELECT."""
+    TimelineEntry.objects.all().delete()
+    _fill(f'follow.author_id IN (SELECT user_id FROM '
+          f'{Profile._meta.db_table} WHERE followers_count <= %s)',
+          [settings.TIMELINE_FANOUT_LIMIT])
+
+
+def followers_changed(author_id, delta):
+    """
+    Вызывается после сдвига счётчика подписчиков. Если автор пересёк
+    лимит, его записи в лентах удаляются (посты подмешиваются при
+    чтении) или заполняются для всех подписчиков заново: иначе пропали
+    бы посты, вышедшие, пока автор был «тяжёлым».
+    """
+    followers = Profile.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if delta > 0 and followers == limit + 1:
+        TimelineEntry.objects.filter(author_id=author_id).delete()
+    elif delta < 0 and followers == limit:
+        _fill('follow.author_id = %s', [author_id])
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Читает материализованную ленту одним проходом по индексу
+    (user, pub_date, post) и подмешивает посты «тяжёлых» авторов,
+    которые не рассылались при записи.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(
+            TimelineEntry.objects.filter(
+                user=user, post__is_deleted=False).select_related(
+                'post__author', 'post__group'),
+            per_page,
+            ordering=('-pub_date', '-post_id'))
+        self.user = user
+
+    def transform(self, row):
+        return row.post
+
+    def fetch(self, values, backward, limit):
+        rows = super().fetch(values, backward, limit)
+        authors = heavy_authors(self.user.id)
+        if not authors:
+            return rows
+        # Ключ записи ленты и ключ поста совпадают: (pub_date, id поста).
+        merged = {key[-1]: (key, obj) for key, obj in rows}
+        for key, obj in self.fetch_heavy(authors, values, backward, limit):
+            merged.setdefault(key[-1], (key, obj))
+        return sorted(merged.values(), key=lambda row: row[0],
+                      reverse=self.descending != backward)[:limit]
+
+    def fetch_heavy(self, authors, values, backward, limit):
+        posts = Post.objects.filter(author_id__in=authors).for_feed()
+        if values is not None:
+            posts = posts.filter(self.seek(POST_ORDERING, values, backward))
+        posts = posts.order_by(*self.order_by(backward, POST_ORDERING))
+        return [((post.pub_date, post.id), post) for post in posts[:limit]]
+
+
+def get_page(user, cursor, per_page):
+    return TimelinePaginator(user, per_page).get_page(cursor)
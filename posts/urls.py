@@ -1,12 +1,26 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('groups/', views.group_list, name='group_list'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search_posts, name='search'),
+    path('hot/', views.hot_posts, name='hot_posts'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('export/author/<str:username>/', views.export_author,
+         name='export_author'),
+    path('export/group/<slug:slug>/', views.export_group,
+         name='export_group'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/group/<slug:slug>/', api.group_posts,
+         name='api_group_posts'),
+    path('api/v1/follow/', api.follow_index, name='api_follow_index'),
+    path('api/v1/<str:username>/', api.profile, name='api_profile'),
+    path('api/v1/<str:username>/<int:post_id>/', api.post_view,
+         name='api_post'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
@@ -18,5 +32,7 @@ urlpatterns = [
     path('<str:username>/<int:post_id>/delete/',
          views.post_delete, name='post_delete'),
     path('<str:username>/<int:post_id>/comment/', views.add_comment,
-         name='add_comment')
+         name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
 ]
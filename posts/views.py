@@ -1,20 +1,28 @@
-from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 
+from . import export, groups, hot, purge, search, thumbnails, timeline
+from .conditional import (anonymous_condition, group_version,
+                          post_version, profile_version)
+from .counters import get_profile
 from .models import Post, Group, Follow
 from .forms import PostForm, CommentForm
-from yatube2.settings import POSTS_IN_PAGINATOR
+from .paginator import paginate
+from yatube2.routers import replica_reads
+from yatube2.settings import (COMMENTS_PER_PAGE, GROUPS_PER_PAGE,
+                              POSTS_IN_PAGINATOR)
 
 User = get_user_model()
 
+COMMENT_ORDERING = ('-created', '-id')
 
+
+@replica_reads
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, POSTS_IN_PAGINATOR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page = paginate(request, post_list, POSTS_IN_PAGINATOR)
     return render(
         request,
         'posts/index.html',
@@ -22,12 +30,48 @@ def index(request):
     )
 
 
+@replica_reads
+def hot_posts(request):
+    page = hot.get_page(request.GET.get('cursor'), POSTS_IN_PAGINATOR)
+    return render(
+        request,
+        'posts/hot.html',
+        {'page': page}
+    )
+
+
+@replica_reads
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page = search.get_page(
+        query, request.GET.get('cursor'), POSTS_IN_PAGINATOR)
+    return render(
+        request,
+        'posts/search.html',
+        {'page': page, 'query': query}
+    )
+
+
+@replica_reads
+def group_list(request):
+    page = paginate(
+        request, Group.objects.select_related('stats'), GROUPS_PER_PAGE,
+        ordering=('title', 'id'))
+    return render(
+        request,
+        'posts/groups.html',
+        {'page': page}
+    )
+
+
+@replica_reads
+@anonymous_condition(group_version)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.filter(group=group)
-    paginator = Paginator(posts, POSTS_IN_PAGINATOR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = groups.get_group(slug)
+    if group is None:
+        raise Http404
+    posts = Post.objects.filter(group_id=group.id).for_feed()
+    page = paginate(request, posts, POSTS_IN_PAGINATOR)
 
     context = {
         'group': group,
@@ -37,34 +81,41 @@ def group_posts(request, slug):
     return render(request, 'posts/group.html', context)
 
 
+@replica_reads
+@anonymous_condition(profile_version)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, POSTS_IN_PAGINATOR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('profile').exclude(
+            profile__is_deleted=True), username=username)
+    author_profile = get_profile(author)
+    posts = author.posts.for_feed()
+    page = paginate(request, posts, POSTS_IN_PAGINATOR)
     following = Follow.objects.filter(
         user=request.user.id, author=author.id)
 
     context = {
         'page': page,
         'author': author,
-        'posts_count': author.posts.count(),
+        'posts_count': author_profile.posts_count,
         'is_active': True,
         'following': following,
-        'follower_count': author.follower.count(),
-        'following_count': author.following.count()
+        'follower_count': author_profile.following_count,
+        'following_count': author_profile.followers_count
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@anonymous_condition(post_version)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__profile'),
+        author__username=username, id=post_id)
     author = post.author
-    posts_count = author.posts.count()
+    posts_count = get_profile(author).posts_count
     form = CommentForm(instance=None)
-    comments = post.comments.select_related('author').all()
+    comments = comments_page(request, post)
 
     context = {
         'post': post,
@@ -77,14 +128,35 @@ def post_view(request, username, post_id):
     return render(request, 'posts/post.html', context)
 
 
+def comments_page(request, post):
+    return paginate(
+        request, post.comments.select_related('author'), COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERING)
+
+
+@replica_reads
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев поста для догрузки на странице."""
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        author__username=username, id=post_id)
+    return render(
+        request,
+        'posts/include/comment_list.html',
+        {'post': post, 'comments': comments_page(request, post)}
+    )
+
+
 @login_required
 def new_post(request):
     if request.method == 'POST':
-        form = PostForm(request.POST)
+        form = PostForm(request.POST, files=request.FILES or None)
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if post.image:
+                thumbnails.schedule(post)
             return redirect('index')
     form = PostForm()
 
@@ -101,6 +173,8 @@ def post_edit(request, username, post_id):
         request.POST or None, files=request.FILES or None, instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect(
             'post', post_id=post.id, username=post.author.username)
     return render(
@@ -127,10 +201,34 @@ def add_comment(request, username, post_id):
 def post_delete(request, username, post_id):
     post = get_object_or_404(
         Post, author__username=username, id=post_id)
-    post.delete()
+    # Пост сразу скрывается, комментарии и файлы удалит purge_deleted.
+    purge.delete_post(post)
     return redirect('profile', username=post.author.username)
 
 
+def _export_response(request, posts, filename):
+    response = StreamingHttpResponse(
+        export.export_lines(posts, comments='comments' in request.GET),
+        content_type='application/x-ndjson')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.ndjson"')
+    return response
+
+
+@login_required
+def export_author(request, username):
+    author = get_object_or_404(User, username=username)
+    return _export_response(
+        request, export.posts_for(username=author.username), author.username)
+
+
+@login_required
+def export_group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _export_response(
+        request, export.posts_for(slug=group.slug), group.slug)
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -146,17 +244,12 @@ def server_error(request):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.select_related('author').filter(
-        author__following__user=request.user)
-    paginator = Paginator(posts, POSTS_IN_PAGINATOR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = timeline.get_page(
+        request.user, request.GET.get('cursor'), POSTS_IN_PAGINATOR)
     return render(
         request,
         'posts/follow.html',
-        {
-            'paginator': paginator,
-            'page': page})
+        {'page': page})
 
 
 @login_required
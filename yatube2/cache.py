@@ -0,0 +1,261 @@
+"""
+Кеш в файле SQLite, общий для всех WSGI-процессов на одном сервере.
+
+В отличие от LocMemCache запись или сброс ключа сразу видны всем
+процессам. incr атомарен, а get_or_set пересчитывает истёкший ключ только
+в одном процессе: остальные в это время отдают устаревшее значение.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube2.cache.SQLiteCache',
+            'LOCATION': '/path/to/cache.sqlite3',
+            'OPTIONS': {'STALE_TIMEOUT': 60, 'LOCK_TIMEOUT': 10},
+        }
+    }
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entries ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB,'
+    ' expires REAL,'
+    ' stale_until REAL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entries_stale_until'
+    ' ON cache_entries (stale_until)',
+)
+
+FRESH = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        # Сколько секунд после истечения ключ ещё можно отдавать, пока
+        # другой процесс его пересчитывает.
+        self._stale_timeout = float(options.get('STALE_TIMEOUT', 60))
+        self._lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        # После fork() соединение родителя использовать нельзя.
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _encode(self, value):
+        # Целые числа хранятся как INTEGER, чтобы incr не распаковывал их.
+        if type(value) is int:
+            return value
+        return sqlite3.Binary(
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def _decode(self, raw):
+        if isinstance(raw, int):
+            return raw
+        return pickle.loads(raw)
+
+    def _expiry(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return None, None
+        return expires, expires + self._stale_timeout
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _write(self, connection, key, value, timeout):
+        expires, stale_until = self._expiry(timeout)
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries'
+            ' (key, value, expires, stale_until) VALUES (?, ?, ?, ?)',
+            (key, self._encode(value), expires, stale_until))
+
+    def _maybe_cull(self):
+        if random.randrange(self._cull_frequency * 50):
+            return
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            'DELETE FROM cache_entries WHERE stale_until < ?', (now,))
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                ' SELECT key FROM cache_entries'
+                ' ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            f'SELECT value FROM cache_entries WHERE key = ? AND {FRESH}',
+            (key, time.time())).fetchone()
+        if row is None:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1)
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        if not made:
+            return {}
+        placeholders = ', '.join('?' * len(made))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM cache_entries'
+            f' WHERE key IN ({placeholders}) AND {FRESH}',
+            (*made, time.time()))
+        found = {made[key]: self._decode(value) for key, value in rows}
+        metrics.record_cache(len(found), len(made) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write(self._connection(), key, value, timeout)
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._transaction() as connection:
+            for key, value in data.items():
+                self._write(connection, self._key(key, version), value,
+                            timeout)
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._add(self._key(key, version), value, timeout)
+
+    def _add(self, key, value, timeout):
+        with self._transaction() as connection:
+            exists = connection.execute(
+                f'SELECT 1 FROM cache_entries WHERE key = ? AND {FRESH}',
+                (key, time.time())).fetchone()
+            if exists:
+                return False
+            self._write(connection, key, value, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires, stale_until = self._expiry(timeout)
+        cursor = self._connection().execute(
+            f'UPDATE cache_entries SET expires = ?, stale_until = ?'
+            f' WHERE key = ? AND {FRESH}',
+            (expires, stale_until, key, time.time()))
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                f'SELECT value FROM cache_entries WHERE key = ? AND {FRESH}',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            connection.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (self._encode(value), key))
+        return value
+
+    def delete(self, key, version=None):
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE key = ?',
+            (self._key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM cache_entries WHERE key = ?',
+                [(self._key(key, version),) for key in keys])
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache_entries WHERE key = ? AND {FRESH}',
+            (key, time.time())).fetchone() is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок процесса: закрывать его после
+        # каждого запроса значит каждый раз заново открывать файл.
+        pass
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Как BaseCache.get_or_set, но истёкший ключ пересчитывает только
+        один процесс. Пока он считает, остальные получают устаревшее
+        значение, а если его нет - ждут не дольше LOCK_TIMEOUT.
+        """
+        key = self._key(key, version)
+        lock = key + ':lock'
+        deadline = time.time() + self._lock_timeout
+        first = True
+        while True:
+            now = time.time()
+            row = self._connection().execute(
+                'SELECT value, expires, stale_until FROM cache_entries'
+                ' WHERE key = ?', (key,)).fetchone()
+            fresh = row is not None and (row[1] is None or row[1] > now)
+            if first:
+                # Один поиск - одно попадание или промах, сколько бы раз
+                # ни пришлось опрашивать ключ в ожидании.
+                metrics.record_cache(*((1, 0) if fresh else (0, 1)))
+                first = False
+            if fresh:
+                return self._decode(row[0])
+            if self._add(lock, 1, self._lock_timeout):
+                try:
+                    value = default() if callable(default) else default
+                    if value is not None:
+                        self._write(self._connection(), key, value, timeout)
+                    return value
+                finally:
+                    self._connection().execute(
+                        'DELETE FROM cache_entries WHERE key = ?', (lock,))
+            if row is not None and row[2] is not None and row[2] > now:
+                return self._decode(row[0])
+            if now >= deadline:
+                # Пересчитывающий процесс завис - не ждём его дальше.
+                return default() if callable(default) else default
+            time.sleep(0.05)
@@ -0,0 +1,117 @@
+"""
+SQLite для продакшена.
+
+При открытии соединения включаются WAL и настроенные PRAGMA, транзакции
+начинаются с BEGIN IMMEDIATE, а запрос вне транзакции, получивший
+«database is locked», повторяется с экспоненциальной задержкой.
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'yatube2.db',
+            'NAME': '/path/to/db.sqlite3',
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {
+                'timeout': 5,
+                'pragmas': {'mmap_size': 268435456},
+                'retries': 5,
+                'retry_delay': 0.05,
+            },
+        }
+    }
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+from .creation import DatabaseCreation
+
+Database = base.Database
+
+DEFAULT_PRAGMAS = {
+    # Читатели не ждут писателя, писатель не ждёт читателей.
+    'journal_mode': 'wal',
+    # В WAL достаточно синхронизировать диск на контрольных точках.
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ: 64 МБ страниц на соединение.
+    'cache_size': -64000,
+    'temp_store': 'memory',
+}
+
+# Параметры OPTIONS, которые не передаются в sqlite3.connect().
+BACKEND_OPTIONS = ('pragmas', 'retries', 'retry_delay', 'immediate')
+
+
+class CursorWrapper(base.SQLiteCursorWrapper):
+    retries = 5
+    retry_delay = 0.05
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, list(param_list))
+
+    def _retry(self, method, *args):
+        attempt = 0
+        while True:
+            try:
+                return method(*args)
+            except Database.OperationalError as error:
+                # Внутри транзакции повтор не поможет: её снимок уже
+                # устарел, откатывать и повторять её целиком должен код.
+                if ('locked' not in str(error) or attempt >= self.retries
+                        or self.connection.in_transaction):
+                    raise
+            time.sleep(self.retry_delay * 2 ** attempt
+                       * (1 + random.random()))
+            attempt += 1
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def backend_options(self):
+        return self.settings_dict['OPTIONS']
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in BACKEND_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {**DEFAULT_PRAGMAS,
+                   **self.backend_options.get('pragmas', {})}
+        # Переход в WAL требует монопольной блокировки, поэтому тоже
+        # повторяется, если база занята.
+        cursor = self._cursor_for(connection)
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+        return connection
+
+    def create_cursor(self, name=None):
+        return self._cursor_for(self.connection)
+
+    def _cursor_for(self, connection):
+        cursor = connection.cursor(factory=CursorWrapper)
+        options = self.backend_options
+        cursor.retries = options.get('retries', CursorWrapper.retries)
+        cursor.retry_delay = options.get(
+            'retry_delay', CursorWrapper.retry_delay)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        # Обычный BEGIN берёт блокировку записи только на первом INSERT,
+        # и если её уже держит другой процесс, транзакция падает сразу,
+        # минуя busy timeout. IMMEDIATE ждёт блокировку в самом начале.
+        if self.backend_options.get('immediate', True):
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,14 @@
+import os
+
+from django.db.backends.sqlite3 import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        super()._destroy_test_db(test_database_name, verbosity)
+        if test_database_name and not self.is_in_memory_db(
+                test_database_name):
+            # В WAL рядом с базой остаются журнал и общая память.
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(test_database_name + suffix):
+                    os.remove(test_database_name + suffix)
@@ -0,0 +1,178 @@
+"""
+Отдача файлов из MEDIA_ROOT.
+
+Доступ к файлу проверяет Django, а байты по возможности передаёт фронт:
+
+    MEDIA_ACCEL = 'x-accel-redirect'   # nginx, internal-локация
+    MEDIA_ACCEL_PREFIX = '/protected-media/'
+    MEDIA_ACCEL = 'x-sendfile'         # Apache mod_xsendfile, lighttpd
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/static/media/;
+    }
+
+Без MEDIA_ACCEL файл отдаёт сам Django потоком FileResponse с поддержкой
+Range и If-Modified-Since. Файлы с хешем содержимого в имени не меняются,
+поэтому кешируются на год.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.static import was_modified_since
+
+from posts.models import Post
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Имена из yatube2.storage.HashedStorage (sha256) и миниатюры sorl (md5).
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{32}([0-9a-f]{32})?\.\w+$')
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_hashed(name):
+    return HASHED_NAME.search(name) is not None
+
+
+def allowed(request, name):
+    """
+    Можно ли отдать файл этому запросу. Медиа сайта публичны, кроме
+    служебных файлов с точкой в начале имени и картинок, на которые
+    ссылаются только скрытые посты. Их миниатюры удаляет
+    posts.images.hide, пока purge не дошёл до самих постов.
+    """
+    if any(part.startswith('.') for part in name.split('/')):
+        return False
+    if name.startswith(Post._meta.get_field('image').upload_to):
+        # Одна картинка бывает у нескольких постов: поиск по индексу image.
+        hidden = set(Post.all_objects.filter(image=name).values_list(
+            'is_deleted', flat=True))
+        return hidden != {True}
+    return True
+
+
+def parse_range(header, size):
+    """
+    (start, end) включительно для одного диапазона, None - отдать файл
+    целиком, ValueError - диапазон за пределами файла.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if match is None:
+        # Несколько диапазонов или другие единицы: RFC 7233 позволяет
+        # ответить всем файлом.
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class RangeFile:
+    """
+    Читает из файла не больше length байт с позиции start. Без fileno(),
+    чтобы wsgi.file_wrapper не отправил через sendfile весь файл.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _if_range_matches(request, mtime):
+    header = request.META.get('HTTP_IF_RANGE')
+    if header is None:
+        return True
+    return parse_http_date_safe(header) == int(mtime)
+
+
+def _accel_response(name, path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_PREFIX + name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def _file_response(request, path, stat, content_type):
+    size = stat.st_size
+    header = request.META.get('HTTP_RANGE')
+    span = None
+    if header and _if_range_matches(request, stat.st_mtime):
+        try:
+            span = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if span is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    start, end = span
+    length = end - start + 1
+    response = FileResponse(RangeFile(open(path, 'rb'), start, length),
+                            status=206, content_type=content_type)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve(request, path):
+    name = os.path.normpath(path).replace(os.sep, '/').lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not allowed(request, name) or not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        content_type = (mimetypes.guess_type(name)[0]
+                        or 'application/octet-stream')
+        if settings.MEDIA_ACCEL:
+            response = _accel_response(name, full_path, content_type)
+        else:
+            response = _file_response(request, full_path, stat,
+                                      content_type)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if is_hashed(name):
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=IMMUTABLE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True,
+                            max_age=settings.MEDIA_MAX_AGE)
+    return response
@@ -0,0 +1,182 @@
+"""
+Метрики запросов в памяти процесса и их выдача в текстовом формате
+Prometheus. Каждый WSGI-процесс считает свои метрики, поэтому Prometheus
+должен опрашивать процессы по отдельности или суммировать их по pid.
+"""
+import bisect
+import hmac
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_local = threading.local()
+
+
+class RequestStats:
+    __slots__ = ('sql_count', 'sql_time', 'template_time', 'template_depth',
+                 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request():
+    _local.stats = None
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def record_cache(hits, misses=0):
+    """Вызывается кеш-бэкендом; вне запроса ничего не делает."""
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [счётчики по корзинам..., +Inf, сумма]
+        self.series = defaultdict(lambda: [0] * (len(buckets) + 2))
+
+    def observe(self, labels, value):
+        series = self.series[labels]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, series in sorted(self.series.items()):
+            label_text = _labels(labels)
+            total = 0
+            for bound, count in zip(self.buckets, series):
+                total += count
+                yield (f'{self.name}_bucket{{{label_text},le="{bound}"}} '
+                       f'{total}')
+            total += series[len(self.buckets)]
+            yield f'{self.name}_bucket{{{label_text},le="+Inf"}} {total}'
+            yield f'{self.name}_sum{{{label_text}}} {series[-1]:.6f}'
+            yield f'{self.name}_count{{{label_text}}} {total}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = defaultdict(float)
+
+    def inc(self, labels, value=1):
+        self.series[labels] += value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self.series.items()):
+            yield f'{self.name}{{{_labels(labels)}}} {value:.15g}'
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            'yatube_requests_total', 'Запросы по view и коду ответа')
+        self.duration = Histogram(
+            'yatube_request_duration_seconds', 'Полное время запроса',
+            DURATION_BUCKETS)
+        self.sql_duration = Histogram(
+            'yatube_sql_duration_seconds', 'Время SQL-запросов за запрос',
+            DURATION_BUCKETS)
+        self.sql_queries = Histogram(
+            'yatube_sql_queries', 'Число SQL-запросов за запрос',
+            QUERY_BUCKETS)
+        self.template_duration = Histogram(
+            'yatube_template_duration_seconds', 'Время отрисовки шаблонов',
+            DURATION_BUCKETS)
+        self.cache = Counter(
+            'yatube_cache_requests_total', 'Попадания и промахи кеша')
+        self.compression_cpu = Counter(
+            'yatube_compression_cpu_seconds_total',
+            'Процессорное время на сжатие ответов')
+        self.compression_bytes = Counter(
+            'yatube_compression_bytes_total',
+            'Байты ответов до и после сжатия')
+        self.metrics = [self.requests, self.duration, self.sql_duration,
+                        self.sql_queries, self.template_duration, self.cache,
+                        self.compression_cpu, self.compression_bytes]
+
+    def observe(self, view, status, total, stats):
+        labels = (('view', view),)
+        with self.lock:
+            self.requests.inc(labels + (('status', str(status)),))
+            self.duration.observe(labels, total)
+            self.sql_duration.observe(labels, stats.sql_time)
+            self.sql_queries.observe(labels, stats.sql_count)
+            self.template_duration.observe(labels, stats.template_time)
+            if stats.cache_hits:
+                self.cache.inc(labels + (('result', 'hit'),),
+                               stats.cache_hits)
+            if stats.cache_misses:
+                self.cache.inc(labels + (('result', 'miss'),),
+                               stats.cache_misses)
+
+    def observe_compression(self, view, cpu, raw, compressed):
+        labels = (('view', view),)
+        with self.lock:
+            self.compression_cpu.inc(labels, cpu)
+            self.compression_bytes.inc(labels + (('stage', 'raw'),), raw)
+            self.compression_bytes.inc(
+                labels + (('stage', 'compressed'),), compressed)
+
+    def render(self):
+        with self.lock:
+            lines = [line for metric in self.metrics
+                     for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {token}'.encode()):
+        return True
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    return request.META.get('REMOTE_ADDR') in allowed
+
+
+def metrics_view(request):
+    if not _metrics_allowed(request):
+        raise Http404
+    response = HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4')
+    response['X-Metrics-Pid'] = str(os.getpid())
+    return response
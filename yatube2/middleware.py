@@ -0,0 +1,203 @@
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.utils.cache import patch_vary_headers
+
+from . import metrics, routers
+from .staticfiles import accepts_gzip
+
+# Уже сжатые форматы: повторное сжатие тратит процессор впустую.
+INCOMPRESSIBLE_TYPES = ('image/', 'video/', 'audio/', 'font/woff',
+                        'application/zip', 'application/gzip',
+                        'application/x-gzip', 'application/pdf',
+                        'application/octet-stream')
+
+
+def _sql_timer(execute, sql, params, many, context):
+    stats = metrics.current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - started
+        stats.sql_count += 1
+
+
+def _install_template_timer():
+    """Оборачивает Template.render, считая только внешний шаблон запроса."""
+    if getattr(Template.render, 'timed', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        stats = metrics.current()
+        if stats is None or stats.template_depth:
+            return original(self, context)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            stats.template_time += time.perf_counter() - started
+            stats.template_depth -= 1
+
+    render.timed = True
+    Template.render = render
+
+
+class RequestMetricsMiddleware:
+    """
+    Для каждого запроса считает число и время SQL-запросов, время
+    шаблонов, попадания в кеш и общее время. Отдаёт их в заголовке
+    Server-Timing и копит гистограммы для /metrics/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        stats = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_sql_timer))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        total = time.perf_counter() - started
+
+        view = _view_name(request)
+        metrics.registry.observe(view, response.status_code, total, stats)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.sql_time * 1000:.1f};'
+            f'desc="SQL x{stats.sql_count}"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+            f'cache;desc="hit {stats.cache_hits} miss {stats.cache_misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    После успешного запроса, меняющего данные, закрепляет клиента за
+    основной базой на REPLICA_PIN_SECONDS, чтобы он видел свою запись.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and response.status_code < 400):
+            response.set_cookie(
+                routers.PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax')
+        return response
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class CompressionMiddleware:
+    """
+    Сжимает gzip ответы длиннее COMPRESSION_MIN_LENGTH, потоковые - по
+    мере отдачи частей. Процессорное время и байты до и после сжатия
+    копятся по view в /metrics/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+        view = _view_name(request)
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, view)
+            del response['Content-Length']
+        else:
+            started = time.thread_time()
+            compressed = self.compressor()
+            content = compressed.compress(response.content)
+            content += compressed.flush()
+            metrics.registry.observe_compression(
+                view, time.thread_time() - started, len(response.content),
+                len(content))
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        # Сжатое тело отличается побайтно: сильный ETag становится слабым,
+        # сравнение в If-None-Match Django всё равно делает слабым.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'gzip'
+        return response
+
+    @staticmethod
+    def compressor():
+        # wbits 16 + MAX_WBITS: заголовок и контрольная сумма gzip.
+        return zlib.compressobj(settings.COMPRESSION_LEVEL, zlib.DEFLATED,
+                                16 + zlib.MAX_WBITS)
+
+    def compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        # Тело отдаст фронт, а Content-Range у 206 считается по несжатому.
+        if (response.has_header('X-Accel-Redirect')
+                or response.has_header('X-Sendfile')):
+            return False
+        if response.status_code not in (200, 203) and (
+                response.status_code < 400):
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return False
+        if response.streaming:
+            return True
+        return len(response.content) >= settings.COMPRESSION_MIN_LENGTH
+
+    def compress_stream(self, chunks, view):
+        """
+        Сжимает части по одной без сброса буфера после каждой: мелкие
+        строки NDJSON иначе почти не сжимаются.
+        """
+        compressed = self.compressor()
+        cpu = 0.0
+        raw = size = 0
+        try:
+            for chunk in chunks:
+                started = time.thread_time()
+                data = compressed.compress(chunk)
+                cpu += time.thread_time() - started
+                raw += len(chunk)
+                size += len(data)
+                if data:
+                    yield data
+            started = time.thread_time()
+            data = compressed.flush()
+            cpu += time.thread_time() - started
+            size += len(data)
+            yield data
+        finally:
+            metrics.registry.observe_compression(view, cpu, raw, size)
@@ -0,0 +1,105 @@
+"""
+Разделение чтения и записи между основной базой и репликами.
+
+Запись и все чтения по умолчанию идут в default. Чтения внутри view,
+помеченных replica_reads, уходят на случайную реплику из
+DATABASE_REPLICAS. После запроса, меняющего данные, ReplicaPinMiddleware
+ставит клиенту куку, и пока она жива, его чтения идут в default: он
+видит свои записи, даже если реплика отстаёт.
+
+    DATABASES['replica1'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, 'db.replica1.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica1']
+"""
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_primary'
+
+# Приложения, модели которых можно читать с реплик. Сессии и прочее
+# служебное всегда читаются из default.
+REPLICA_APPS = {'posts', 'auth'}
+
+_local = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+@contextmanager
+def reading_from_replicas(enabled=True):
+    previous = getattr(_local, 'enabled', False)
+    _local.enabled = enabled
+    try:
+        yield
+    finally:
+        _local.enabled = previous
+
+
+def replica_reads(view):
+    """Чтения view идут на реплики, если клиент не закреплён за default."""
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        enabled = (request.method in ('GET', 'HEAD')
+                   and not is_pinned(request))
+        with reading_from_replicas(enabled):
+            return view(request, *args, **kwargs)
+    return inner
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_local, 'enabled', False):
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label not in REPLICA_APPS:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них можно связывать.
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        return obj1._state.db in pool and obj2._state.db in pool
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с данными из default.
+        return db == DEFAULT_DB_ALIAS
+
+
+def copy_database(source, target):
+    """
+    Заменитель репликации для локальной проверки: переносит файл SQLite
+    целиком через backup API, не мешая писателям в source.
+    """
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+def sync_replicas():
+    databases = settings.DATABASES
+    source = databases[DEFAULT_DB_ALIAS]['NAME']
+    for alias in replicas():
+        copy_database(source, databases[alias]['NAME'])
+    return replicas()
@@ -0,0 +1,29 @@
+"""
+Запуск тестов с кешем во временном файле.
+
+Тесты сбрасывают кеш и кладут в него группы и фрагменты шаблонов, поэтому
+рабочий cache.sqlite3 они трогать не должны.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.TemporaryDirectory()
+        caches = {
+            alias: {**options, 'LOCATION': os.path.join(
+                self._cache_dir.name, f'{alias}.sqlite3')}
+            for alias, options in settings.CACHES.items()}
+        self._cache_override = override_settings(CACHES=caches)
+        self._cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_override.disable()
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -53,6 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube2.middleware.RequestMetricsMiddleware',
+    'yatube2.middleware.ReplicaPinMiddleware',
+    'yatube2.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,13 +91,33 @@ WSGI_APPLICATION = 'yatube2.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube2.db - SQLite с WAL, настроенными PRAGMA и повтором при
+# блокировке; соединение живёт между запросами.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube2.db',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        # Тестовая база - файл, а не общая база в памяти: в памяти не
+        # работают ни WAL, ни ожидание блокировки, и параллельные
+        # запросы из потоков падают с «database table is locked».
+        'TEST': {'NAME': os.path.join(
+            tempfile.gettempdir(), f'yatube2-test-{os.getpid()}.sqlite3')},
+        'OPTIONS': {
+            'timeout': 5,
+            'retries': 5,
+            'retry_delay': 0.05,
+        },
     }
 }
 
+# Чтения лент и страниц постов уходят на реплики из DATABASE_REPLICAS
+# (пример настройки - в yatube2/routers.py), запись - в default.
+DATABASE_ROUTERS = ['yatube2.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+# Сколько секунд после записи клиент читает из default.
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -132,11 +156,22 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Сюда collectstatic пишет файлы с хешами и их .gz-копии. Отдельно от
+# static/, где лежат медиа.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'yatube2.staticfiles.CompressedManifestStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = 'static/media'
 
+# Кто передаёт байты медиафайлов после проверки доступа в Django:
+# None - сам Django, 'x-accel-redirect' - nginx через internal-локацию
+# MEDIA_ACCEL_PREFIX, 'x-sendfile' - Apache или lighttpd.
+MEDIA_ACCEL = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Кеширование файлов без хеша содержимого в имени.
+MEDIA_MAX_AGE = 3600
+
 
 # Login
 
@@ -154,18 +189,56 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 # Constants
 
 POSTS_IN_PAGINATOR = 10
+COMMENTS_PER_PAGE = 20
+GROUPS_PER_PAGE = 50
+
+# Ответы короче этого не сжимаются: выигрыш меньше заголовков.
+COMPRESSION_MIN_LENGTH = 1024
+COMPRESSION_LEVEL = 6
+
+# Авторы с большим числом подписчиков не рассылаются по лентам при
+# публикации, их посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Миниатюры картинок постов: основной размер карточки и ширины для srcset.
+POST_THUMBNAIL_SIZE = (960, 339)
+POST_THUMBNAIL_WIDTHS = (480, 960, 1440)
+THUMBNAIL_WORKERS = 2
+
+# Оригиналы картинок больше этого размера уменьшаются при загрузке.
+POST_IMAGE_MAX_SIZE = (2048, 2048)
+POST_IMAGE_QUALITY = 85
 
 
 # Cache
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube2.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'STALE_TIMEOUT': 60,
+            'LOCK_TIMEOUT': 10,
+        },
     }
 }
 
+# Тесты получают свой кеш во временном каталоге.
+TEST_RUNNER = 'yatube2.runner.TestRunner'
+
 # django-debug-toolbar
 
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
+
+# Метрики
+
+# /metrics/ открыт запросу с заголовком «Authorization: Bearer
+# <METRICS_TOKEN>» (bearer_token в scrape_config Prometheus) или с адреса
+# из METRICS_ALLOWED_IPS. Адрес берётся из REMOTE_ADDR: за nginx на той же
+# машине все клиенты приходят с 127.0.0.1, поэтому там список оставляют
+# пустым и пользуются токеном (или закрывают /metrics/ в самом nginx).
+METRICS_ALLOWED_IPS = []
+METRICS_TOKEN = None
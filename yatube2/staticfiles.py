@@ -0,0 +1,172 @@
+"""
+Статика с хешами в именах, сжатая заранее и отдаваемая из WSGI.
+
+collectstatic через CompressedManifestStorage пишет в STATIC_ROOT файлы
+вида app.3f2a9c.css, манифест staticfiles.json и рядом с текстовыми
+файлами их .gz-копии. StaticFilesApp оборачивает WSGI-приложение и
+отдаёт STATIC_URL по индексу файлов, собранному в памяти при старте,
+не запуская middleware и view Django.
+"""
+import gzip
+import json
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import http_date, parse_http_date_safe
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html',
+                '.xml', '.ico', '.eot', '.ttf', '.otf')
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Файлы без хеша в имени могут поменяться при следующей выкладке.
+PLAIN_CACHE = 'public, max-age=300'
+
+BLOCK_SIZE = 64 * 1024
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # В тестах и при DEBUG collectstatic не запускали: без манифеста
+        # отдаём исходное имя вместо ошибки.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if self.compress(name):
+                yield name, name + '.gz', True
+
+    def compress(self, name):
+        """Пишет name.gz, если файл текстовый и сжатие что-то даёт."""
+        if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+            return False
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        # mtime=0: одинаковый файл даёт одинаковый .gz при каждой сборке.
+        compressed = gzip.compress(content, 9, mtime=0)
+        if len(compressed) >= len(content):
+            return False
+        with open(path + '.gz', 'wb') as target:
+            target.write(compressed)
+        return True
+
+
+def accepts_gzip(header):
+    for coding in header.split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            quality = params.strip().replace(' ', '')
+            return quality not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+class StaticFile:
+    __slots__ = ('path', 'size', 'gzip_path', 'gzip_size', 'mtime', 'etag',
+                 'headers')
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'"{self.mtime:x}-{self.size:x}"'
+        self.gzip_path = self.gzip_size = None
+        if os.path.isfile(path + '.gz'):
+            self.gzip_path = path + '.gz'
+            self.gzip_size = os.path.getsize(self.gzip_path)
+        content_type, _ = mimetypes.guess_type(path)
+        if content_type and content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        self.headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Cache-Control', IMMUTABLE_CACHE if immutable else PLAIN_CACHE),
+            ('Last-Modified', http_date(self.mtime)),
+        ]
+        if self.gzip_path:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+
+def build_index(root, url):
+    """URL -> StaticFile для всех файлов root, кроме .gz-копий."""
+    hashed = set()
+    manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+    if os.path.isfile(manifest):
+        with open(manifest, encoding='utf-8') as source:
+            hashed = set(json.load(source).get('paths', {}).values())
+    index = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.endswith('.gz') and os.path.isfile(path[:-3]):
+                continue
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            index[url + name] = StaticFile(path, name in hashed)
+    return index
+
+
+class StaticFilesApp:
+    """WSGI-обёртка, отдающая собранную статику мимо Django."""
+
+    def __init__(self, application, root=None, url=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        self.url = url or settings.STATIC_URL
+        self.index = build_index(root, self.url) if (
+            root and os.path.isdir(root)) else {}
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        static = self.index.get(path) if path.startswith(self.url) else None
+        if static is None:
+            return self.application(environ, start_response)
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed',
+                           [('Allow', 'GET, HEAD'),
+                            ('Content-Length', '0')])
+            return []
+        headers = list(static.headers)
+        file_path, size, etag = static.path, static.size, static.etag
+        if static.gzip_path and accepts_gzip(
+                environ.get('HTTP_ACCEPT_ENCODING', '')):
+            # У сжатого варианта свой ETag: байты у него другие.
+            file_path, size = static.gzip_path, static.gzip_size
+            etag = etag[:-1] + '-gzip"'
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('ETag', etag))
+        if self.not_modified(environ, static, etag):
+            # Content-Type первым в списке, в 304 он не нужен.
+            start_response('304 Not Modified', headers[1:])
+            return []
+        headers.append(('Content-Length', str(size)))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        file = open(file_path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(file, BLOCK_SIZE)
+        return _read_blocks(file)
+
+    @staticmethod
+    def not_modified(environ, static, etag):
+        etags = environ.get('HTTP_IF_NONE_MATCH')
+        if etags is not None:
+            return etag in etags or etags.strip() == '*'
+        since = parse_http_date_safe(
+            environ.get('HTTP_IF_MODIFIED_SINCE') or '')
+        return since is not None and since >= static.mtime
+
+
+def _read_blocks(file):
+    with file:
+        yield from iter(lambda: file.read(BLOCK_SIZE), b'')
@@ -0,0 +1,45 @@
+"""
+Хранилище медиафайлов с именами по содержимому.
+
+Файл сохраняется как <каталог>/<ab>/<sha256><расширение>, поэтому
+одинаковые картинки разных постов лежат на диске один раз: повторная
+загрузка только возвращает имя уже сохранённого файла. Удалять файл
+можно, лишь когда на него не ссылается ни одна запись, - за этим следит
+posts.images.release.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class HashedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        # При гонке двух одинаковых загрузок вторая получит имя с
+        # суффиксом: лишняя копия, но не потерянный файл.
+        return self._save(name, content)
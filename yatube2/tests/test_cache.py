@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from yatube2 import metrics
+from yatube2.cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self):
+        return SQLiteCache(self.location, {
+            'TIMEOUT': 300,
+            'OPTIONS': {'STALE_TIMEOUT': 60, 'LOCK_TIMEOUT': 2}})
+
+    def test_tests_use_temporary_cache(self):
+        """Тесты пишут в свой кеш, а не в cache.sqlite3 проекта."""
+        location = settings.CACHES['default']['LOCATION']
+        self.assertTrue(location.startswith(tempfile.gettempdir()))
+
+    def test_values_shared_between_instances(self):
+        """Запись одного экземпляра видна другому, как другому процессу."""
+        self.cache.set('key', {'value': 1})
+        other = self.make_cache()
+        self.assertEqual(other.get('key'), {'value': 1})
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_versioned_keys(self):
+        """Версии ключа хранятся независимо."""
+        self.cache.set('key', 'old', version=1)
+        self.cache.set('key', 'new', version=2)
+        self.assertEqual(self.cache.get('key', version=1), 'old')
+        self.assertEqual(self.cache.get('key', version=2), 'new')
+        self.cache.incr_version('key', version=2)
+        self.assertEqual(self.cache.get('key', version=3), 'new')
+
+    def test_incr_is_atomic(self):
+        """Параллельные incr не теряют приращений."""
+        self.cache.set('counter', 0)
+
+        def worker():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_key_is_a_miss(self):
+        """Истёкший ключ не отдаётся обычным get."""
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'again'))
+        self.assertFalse(self.cache.add('key', 'third'))
+
+    def test_get_or_set_serves_stale_while_rebuilding(self):
+        """Пока один процесс пересчитывает ключ, другой получает старое
+        значение, а функция пересчёта вызывается один раз."""
+        self.cache.set('hot', 'stale', timeout=-1)
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def rebuild():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return 'fresh'
+
+        thread = threading.Thread(
+            target=lambda: self.make_cache().get_or_set('hot', rebuild))
+        thread.start()
+        started.wait(2)
+        self.assertEqual(self.cache.get_or_set('hot', rebuild), 'stale')
+        release.set()
+        thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(self.cache.get('hot'), 'fresh')
+
+    def test_get_or_set_waits_when_nothing_to_serve(self):
+        """Без устаревшего значения ждём результата пересчёта."""
+        started = threading.Event()
+
+        def rebuild():
+            started.set()
+            time.sleep(0.2)
+            return 'fresh'
+
+        thread = threading.Thread(
+            target=lambda: self.make_cache().get_or_set('cold', rebuild))
+        thread.start()
+        started.wait(2)
+        stats = metrics.start_request()
+        self.addCleanup(metrics.finish_request)
+        self.assertEqual(
+            self.cache.get_or_set('cold', lambda: 'other'), 'fresh')
+        thread.join()
+        # Ожидание с опросом ключа считается одним промахом.
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (0, 1))
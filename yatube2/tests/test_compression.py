@@ -0,0 +1,89 @@
+import gzip
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from yatube2 import metrics
+from yatube2.middleware import CompressionMiddleware
+from yatube2.settings import COMPRESSION_MIN_LENGTH
+
+User = get_user_model()
+
+
+def compress(response, encoding='gzip'):
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class CompressionMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='writer')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Повторяющийся текст поста {number}')
+            for number in range(10))
+
+    def test_html_page_compressed(self):
+        """Лента уходит сжатой, с Vary и верной длиной."""
+        response = self.client.get(reverse('index'),
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+        self.assertIn('Повторяющийся текст'.encode(),
+                      gzip.decompress(response.content))
+
+    def test_not_compressed_without_accept_encoding(self):
+        """Клиент без gzip получает исходный ответ, но с Vary."""
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_and_binary_responses_skipped(self):
+        """Короткие ответы и уже сжатые форматы не трогаются."""
+        small = compress(HttpResponse('x' * (COMPRESSION_MIN_LENGTH - 1)))
+        image = compress(HttpResponse(b'x' * 10000,
+                                      content_type='image/jpeg'))
+        for response in (small, image):
+            with self.subTest(content_type=response['Content-Type']):
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertFalse(response.has_header('Vary'))
+
+    def test_streaming_response_compressed(self):
+        """Потоковый ответ сжимается по частям и без Content-Length."""
+        lines = [f'{{"id": {number}}}\n' for number in range(1000)]
+        response = StreamingHttpResponse(
+            iter(lines), content_type='application/x-ndjson')
+        response['Content-Length'] = '1'
+        response = compress(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body).decode(), ''.join(lines))
+
+    def test_strong_etag_weakened(self):
+        """Сильный ETag сжатого ответа становится слабым."""
+        response = HttpResponse('x' * COMPRESSION_MIN_LENGTH * 2)
+        response['ETag'] = '"abc"'
+        self.assertEqual(compress(response)['ETag'], 'W/"abc"')
+
+    def test_rejected_encoding_respected(self):
+        """gzip;q=0 отключает сжатие."""
+        response = compress(HttpResponse('x' * COMPRESSION_MIN_LENGTH * 2),
+                            encoding='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_compression_metrics_per_view(self):
+        """В /metrics/ есть время сжатия и байты по view."""
+        self.client.get(reverse('index'), HTTP_ACCEPT_ENCODING='gzip')
+        body = metrics.registry.render()
+        self.assertIn('yatube_compression_cpu_seconds_total{view="index"}',
+                      body)
+        self.assertIn('yatube_compression_bytes_total'
+                      '{view="index",stage="raw"}', body)
+        self.assertIn('yatube_compression_bytes_total'
+                      '{view="index",stage="compressed"}', body)
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        with sqlite3.connect(self.path) as raw:
+            raw.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+
+    def connect(self, **options):
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'yatube2.db', 'NAME': self.path,
+            'OPTIONS': {'timeout': 0.01, **options}}})
+        connection = handler['default']
+        self.addCleanup(connection.close)
+        return connection
+
+    def hold_write_lock(self, seconds):
+        other = sqlite3.connect(self.path, isolation_level=None,
+                                check_same_thread=False)
+        other.execute('BEGIN IMMEDIATE')
+        timer = threading.Timer(seconds, other.execute, ['COMMIT'])
+        timer.start()
+        self.addCleanup(timer.join)
+
+    def test_pragmas_applied(self):
+        """Соединение открывается в WAL с настроенными PRAGMA."""
+        connection = self.connect(pragmas={'cache_size': -1000})
+        with connection.cursor() as cursor:
+            values = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                      for name in ('journal_mode', 'synchronous',
+                                   'cache_size')}
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1,
+                                  'cache_size': -1000})
+
+    def test_locked_write_is_retried(self):
+        """Запись вне транзакции дожидается снятия блокировки."""
+        connection = self.connect(retries=10, retry_delay=0.02)
+        self.hold_write_lock(0.1)
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO item (id) VALUES (%s)', [1])
+            self.assertEqual(
+                cursor.execute('SELECT COUNT(*) FROM item').fetchone(), (1,))
+
+    def test_without_retries_lock_fails(self):
+        """Без повторов блокировка сразу даёт ошибку."""
+        connection = self.connect(retries=0)
+        self.hold_write_lock(0.1)
+        with self.assertRaises(OperationalError):
+            with connection.cursor() as cursor:
+                cursor.execute('INSERT INTO item (id) VALUES (%s)', [1])
+
+    def test_transactions_take_write_lock_immediately(self):
+        """Транзакция сразу берёт блокировку записи."""
+        connection = self.connect()
+        connection.ensure_connection()
+        connection._start_transaction_under_autocommit()
+        self.addCleanup(connection.connection.execute, 'ROLLBACK')
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with self.assertRaises(sqlite3.OperationalError):
+            other.execute('BEGIN IMMEDIATE')
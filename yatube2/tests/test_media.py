@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from yatube2.media import parse_range
+
+HASHED = 'posts/ab/' + 'ab' * 32 + '.jpg'
+
+
+class MediaServeTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name,
+                                     MEDIA_ACCEL=None)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.write(HASHED, b'0123456789')
+        self.write('about/photo.png', b'png')
+        self.write('.secret', b'secret')
+
+    def write(self, name, content):
+        path = os.path.join(self.media.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def get(self, name, **headers):
+        return self.client.get(reverse('media', args=[name]), **headers)
+
+    def test_serves_file_with_cache_headers(self):
+        """Файл с хешем в имени кешируется надолго, остальные - на час."""
+        response = self.get(HASHED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content),
+                         b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        response = self.get('about/photo.png')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_range_request(self):
+        """Range отдаёт часть файла с кодом 206."""
+        response = self.get(HASHED, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        response = self.get(HASHED, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_returns_whole_file(self):
+        """Устаревший If-Range отменяет диапазон."""
+        response = self.get(HASHED, HTTP_RANGE='bytes=2-5',
+                            HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """Неизменившийся файл отдаётся как 304."""
+        last_modified = self.get(HASHED)['Last-Modified']
+        response = self.get(HASHED, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_hidden_and_outside_files_not_found(self):
+        """Служебные файлы и пути за пределами MEDIA_ROOT не отдаются."""
+        for name in ('.secret', '../settings.py', 'missing.jpg', 'posts'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect',
+                       MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        """С nginx тело не отдаётся, путь уходит в X-Accel-Redirect."""
+        response = self.get(HASHED)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/' + HASHED)
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_x_sendfile(self):
+        """С X-Sendfile фронт получает абсолютный путь к файлу."""
+        response = self.get('about/photo.png')
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(self.media.name, 'about/photo.png'))
+
+    def test_parse_range(self):
+        """Разбор заголовка Range."""
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=10-', 10)
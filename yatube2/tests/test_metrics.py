@@ -0,0 +1,49 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+
+class RequestMetricsTest(TestCase):
+    def test_server_timing_header(self):
+        """Ответ содержит разбивку времени запроса в Server-Timing."""
+        response = self.client.get(reverse('index'))
+        timing = response['Server-Timing']
+        for part in ('db;dur=', 'SQL x', 'tpl;dur=', 'cache;desc=',
+                     'total;dur='):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_exposes_histograms(self):
+        """/metrics/ отдаёт гистограммы в формате Prometheus."""
+        self.client.get(reverse('index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      body)
+        self.assertIn('yatube_sql_queries_bucket{view="index",le="+Inf"}',
+                      body)
+        self.assertIn('yatube_requests_total{view="index",status="200"}',
+                      body)
+
+    def test_metrics_endpoint_hidden_from_outside(self):
+        """Посторонним адресам /metrics/ не виден."""
+        client = Client(REMOTE_ADDR='203.0.113.7')
+        response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_closed_behind_local_proxy(self):
+        """Запрос через локальный прокси без верного токена получает 404."""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = Client(REMOTE_ADDR='127.0.0.1').get(
+                    reverse('metrics'), **headers)
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_open_to_allowed_ip(self):
+        """Адрес из METRICS_ALLOWED_IPS видит метрики без токена."""
+        response = Client(REMOTE_ADDR='10.0.0.5').get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post, Profile
+from yatube2 import routers
+
+User = get_user_model()
+
+
+def chosen_database(request):
+    """View-заглушка: возвращает базу, выбранную для чтения постов."""
+    return routers.ReplicaRouter().db_for_read(Post)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.view = routers.replica_reads(chosen_database)
+        self.factory = RequestFactory()
+
+    def test_reads_go_to_replicas_only_inside_marked_views(self):
+        """Реплики используются только внутри replica_reads."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.view(self.factory.get('/')), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_service_tables_stay_on_primary(self):
+        """Сессии читаются из основной базы и внутри replica_reads."""
+        with routers.reading_from_replicas():
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_pinned_and_unsafe_requests_use_primary(self):
+        """Закреплённый клиент и POST читают из основной базы."""
+        request = self.factory.get('/')
+        request.COOKIES[routers.PIN_COOKIE] = '1'
+        self.assertEqual(self.view(request), 'default')
+        self.assertEqual(self.view(self.factory.post('/')), 'default')
+
+
+class ReplicaPinTest(TestCase):
+    def test_write_pins_client_to_primary(self):
+        """После комментария клиенту ставится кука закрепления."""
+        user = User.objects.create_user(username='pinned')
+        post = Post.objects.create(text='Пост', author=user)
+        self.client.force_login(user)
+        response = self.client.get(reverse('index'))
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        response = self.client.post(
+            reverse('add_comment', kwargs={
+                'username': 'pinned', 'post_id': post.id}),
+            {'text': 'Комментарий'})
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+
+
+class ReplicaFilesTest(TransactionTestCase):
+    """Реплика - настоящий файл, отстающий от основной базы."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(directory.name, 'replica.sqlite3')}
+        self.addCleanup(self.drop_replica)
+        override = override_settings(DATABASE_REPLICAS=['replica'])
+        override.enable()
+        self.addCleanup(override.disable)
+        self.author = User.objects.create_user(username='replica_author')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.post_url = reverse('post', kwargs={
+            'username': 'replica_author', 'post_id': self.post.id})
+
+    @staticmethod
+    def drop_replica():
+        connections['replica'].close()
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+
+    def test_pinned_client_reads_own_writes(self):
+        """После записи клиент читает из основной базы, остальные - с
+        отстающей реплики."""
+        routers.sync_replicas()
+        other = self.client_class()
+        for client in (self.client, other):
+            client.force_login(self.author)
+        self.client.post(
+            reverse('add_comment', kwargs={
+                'username': 'replica_author', 'post_id': self.post.id}),
+            {'text': 'Свежий комментарий'})
+        self.assertContains(self.client.get(self.post_url),
+                            'Свежий комментарий')
+        self.assertNotContains(other.get(self.post_url),
+                               'Свежий комментарий')
+        routers.sync_replicas()
+        self.assertContains(other.get(self.post_url), 'Свежий комментарий')
+
+    def test_missing_profile_created_on_primary(self):
+        """Профиль, которого нет на реплике, создаётся и читается из
+        основной базы."""
+        Profile.objects.filter(user=self.author).delete()
+        routers.sync_replicas()
+        response = self.client.get(reverse(
+            'profile', kwargs={'username': 'replica_author'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertTrue(Profile.objects.filter(user=self.author).exists())
+
+
+class CopyDatabaseTest(TestCase):
+    def test_copy_database(self):
+        """Заменитель репликации переносит данные в файл реплики."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with sqlite3.connect(source) as connection:
+                connection.execute('CREATE TABLE item (name TEXT)')
+                connection.execute("INSERT INTO item VALUES ('пост')")
+            connection.close()
+            routers.copy_database(source, target)
+            replica = sqlite3.connect(target)
+            self.assertEqual(
+                replica.execute('SELECT name FROM item').fetchall(),
+                [('пост',)])
+            replica.close()
@@ -0,0 +1,96 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.templatetags.static import static
+
+from yatube2.staticfiles import StaticFilesApp
+
+
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.TemporaryDirectory()
+        with override_settings(STATIC_ROOT=cls.root.name):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(cls.root.name, 'staticfiles.json')) as file:
+            cls.manifest = json.load(file)['paths']
+        cls.app = StaticFilesApp(cls.fallback, cls.root.name, '/static/')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.root.cleanup()
+        super().tearDownClass()
+
+    @staticmethod
+    def fallback(environ, start_response):
+        start_response('404 Not Found', [])
+        return [b'django']
+
+    def call(self, path, **headers):
+        environ = RequestFactory().get(path, **headers).environ
+        result = {}
+
+        def start_response(status, headers):
+            result['status'] = status
+            result['headers'] = dict(headers)
+
+        body = b''.join(self.app(environ, start_response))
+        return result['status'], result['headers'], body
+
+    def test_collect_writes_hashed_and_gzipped_files(self):
+        """collectstatic пишет файлы с хешем и их .gz-копии."""
+        hashed = self.manifest['admin/css/base.css']
+        self.assertRegex(hashed, r'^admin/css/base\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root.name, hashed)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as packed:
+            self.assertEqual(original.read(), packed.read())
+
+    def test_serves_gzip_when_accepted(self):
+        """Сжатая копия отдаётся клиенту, который принимает gzip."""
+        path = '/static/' + self.manifest['admin/css/base.css']
+        status, headers, body = self.call(
+            path, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertTrue(gzip.decompress(body).startswith(b'/*'))
+
+        status, headers, body = self.call(
+            path, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertTrue(body.startswith(b'/*'))
+
+    def test_unhashed_name_short_cache(self):
+        """Файл без хеша в имени кешируется ненадолго."""
+        status, headers, _ = self.call('/static/admin/css/base.css')
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('immutable', headers['Cache-Control'])
+
+    def test_not_modified(self):
+        """Совпавший ETag даёт 304 без тела."""
+        path = '/static/' + self.manifest['admin/css/base.css']
+        _, headers, _ = self.call(path)
+        status, _, body = self.call(path, HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_unknown_paths_go_to_django(self):
+        """Всё, чего нет в индексе, обрабатывает приложение."""
+        for path in ('/static/missing.css', '/posts/'):
+            with self.subTest(path=path):
+                status, _, body = self.call(path)
+                self.assertEqual(body, b'django')
+
+    def test_static_tag_without_manifest(self):
+        """Без собранного манифеста {% static %} отдаёт исходное имя."""
+        with tempfile.TemporaryDirectory() as empty:
+            with override_settings(STATIC_ROOT=empty):
+                self.assertEqual(static('missing/app.css'),
+                                 '/static/missing/app.css')
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from yatube2.staticfiles import StaticFilesApp
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube2.settings')
 
 application = get_wsgi_application()
+
+# Собранная статика отдаётся до Django, остальное идёт в приложение.
+application = StaticFilesApp(application)